@@ -0,0 +1,65 @@
+"""
+    Synthetic chains for benchmarks. Every chain is connected and absorbing,
+    so it can be used for any analysis, including drawing.
+    Generators return lists of edges, so building the chain can be timed separately.
+"""
+
+import random
+
+
+def random_sparse_edges(n, degree=3, exit_probability=0.1, seed=0):
+    """ n transient nodes, each with degree random edges and an edge to absorbing node n. """
+    rng = random.Random(seed)
+    edges = []
+    for i in range(n):
+        targets = rng.sample(range(n), degree)
+        probability = (1 - exit_probability) / degree
+        edges.extend((i, j, probability) for j in targets)
+        edges.append((i, n, exit_probability))
+    return edges
+
+
+def corridor_edges(n, forward=0.6):
+    """ A long corridor of n nodes, moving forward or back, and absorbed at node n. """
+    edges = [(0, 1, forward), (0, 0, 1 - forward)]
+    for i in range(1, n):
+        edges.append((i, i + 1, forward))
+        edges.append((i, i - 1, 1 - forward))
+    return edges
+
+
+def lattice_edges(n):
+    """
+        A triangular lattice like the grid in test_triangle.py, with nodes (x, y) for
+        0 <= y <= x <= n. Each node moves to (x - 1, y) or (x - 1, y + 1), so nodes
+        with x = 0 are absorbing.
+    """
+
+    def index(x, y):
+        return x * (x + 1) // 2 + y
+
+    edges = []
+    for x in range(1, n + 1):
+        for y in range(x + 1):
+            edges.append((index(x, y), index(x - 1, min(y, x - 1)), 0.5))
+            edges.append((index(x, y), index(x - 1, min(y + 1, x - 1)), 0.5))
+    return edges
+
+
+def clique_edges(n, exit_probability=0.1):
+    """ n transient nodes, each with an edge to every other, and to absorbing node n. """
+    probability = (1 - exit_probability) / (n - 1)
+    edges = []
+    for i in range(n):
+        edges.extend((i, j, probability) for j in range(n) if j != i)
+        edges.append((i, n, exit_probability))
+    return edges
+
+
+# Parameters for each family at each scale, giving roughly similar numbers of nodes
+FAMILIES = {
+    'random_sparse': (random_sparse_edges, {'small': 50, 'medium': 200, 'large': 1000}),
+    'corridor': (corridor_edges, {'small': 50, 'medium': 200, 'large': 1000}),
+    'lattice': (lattice_edges, {'small': 9, 'medium': 19, 'large': 44}),
+    'clique': (clique_edges, {'small': 20, 'medium': 60, 'large': 150}),
+}
@@ -0,0 +1,176 @@
+"""
+    Benchmarks for building, analysing and drawing chains.
+
+    Run from the repository root:
+        python benchmarks/run_benchmarks.py
+        python benchmarks/run_benchmarks.py --scales small medium --benchmarks get_expected_steps
+
+    Times and peak memory are compared against benchmarks/baselines.json, and any result
+    worse than its baseline by more than the tolerance is reported as a regression,
+    with exit code 1. Results without a baseline are reported with exit code 2, since
+    nothing was checked. Use --save to store the current results as the baselines;
+    baselines are only comparable when run on the same machine, so none are committed.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from markov_chain import MarkovChain
+from draw_svg import get_chain_svg
+from chains import FAMILIES
+
+# Exit codes
+REGRESSIONS_FOUND = 1
+BASELINES_MISSING = 2
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+SCALES = ('small', 'medium', 'large')
+
+# Node layout doesn't terminate for chains with many cycles between arbitrary nodes
+LAYOUT_FAMILIES = ('corridor', 'lattice', 'clique')
+
+
+def add_edges(edges):
+    chain = MarkovChain(max(max(edge[:2]) for edge in edges) + 1)
+    chain.add_edges(edges)
+
+
+def get_chain_svg_output(chain):
+    get_chain_svg(chain).write()
+
+
+# Name: (function, whether it takes the edge list rather than a chain, families)
+BENCHMARKS = {
+    'add_edges': (add_edges, True, tuple(FAMILIES)),
+    'is_connected': (MarkovChain.is_connected, False, tuple(FAMILIES)),
+    'get_expected_steps': (MarkovChain.get_expected_steps, False, tuple(FAMILIES)),
+    'set_node_depths': (MarkovChain.set_node_depths, False, LAYOUT_FAMILIES),
+    'get_node_positions': (MarkovChain.get_node_positions, False, LAYOUT_FAMILIES),
+    'get_chain_svg': (get_chain_svg_output, False, LAYOUT_FAMILIES),
+}
+
+
+def measure(function, argument, repeat):
+    """ Return the best time of repeat runs, and the peak memory allocated during one run. """
+    best_time = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(argument)
+        best_time = min(best_time, time.perf_counter() - start)
+
+    # Measure memory separately, since tracing slows down allocation
+    tracemalloc.start()
+    function(argument)
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {'time': best_time, 'peak_memory': peak_memory}
+
+
+def run_benchmarks(benchmark_names, family_names, scales, repeat):
+    results = {}
+    for family_name in family_names:
+        generator, sizes = FAMILIES[family_name]
+        for scale in scales:
+            edges = generator(sizes[scale])
+            chain = MarkovChain(edges=edges)
+
+            for benchmark_name in benchmark_names:
+                function, takes_edges, families = BENCHMARKS[benchmark_name]
+                if family_name not in families:
+                    continue
+
+                key = '{0}/{1}/{2}'.format(benchmark_name, family_name, scale)
+                results[key] = measure(function, edges if takes_edges else chain, repeat)
+                print('{0: <48} {1: >10.4f} s {2: >12,d} B'.format(
+                    key, results[key]['time'], results[key]['peak_memory']
+                ))
+
+    return results
+
+
+def compare_with_baselines(results, baselines, time_tolerance, memory_tolerance, min_time=0.001):
+    """
+        Return a list of descriptions of results which are worse than their baselines.
+        Slowdowns of less than min_time seconds are ignored, since they are mostly noise.
+    """
+    regressions = []
+    for key, result in sorted(results.items()):
+        baseline = baselines.get(key)
+        if baseline is None:
+            continue
+
+        slowdown = result['time'] - baseline['time']
+        if slowdown > min_time and result['time'] > baseline['time'] * (1 + time_tolerance):
+            regressions.append('{0}: time {1:.4f} s, baseline {2:.4f} s'.format(
+                key, result['time'], baseline['time']
+            ))
+
+        if result['peak_memory'] > baseline['peak_memory'] * (1 + memory_tolerance):
+            regressions.append('{0}: peak memory {1:,d} B, baseline {2:,d} B'.format(
+                key, result['peak_memory'], baseline['peak_memory']
+            ))
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark building, analysing and drawing chains.')
+    parser.add_argument('--benchmarks', nargs='+', choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument('--families', nargs='+', choices=list(FAMILIES), default=list(FAMILIES))
+    parser.add_argument('--scales', nargs='+', choices=SCALES, default=list(SCALES))
+    parser.add_argument('--repeat', type=int, default=3, help='runs to take the best time from')
+    parser.add_argument('--time-tolerance', type=float, default=0.5, help='allowed fractional slowdown')
+    parser.add_argument('--min-time', type=float, default=0.001, help='smallest slowdown in seconds to report')
+    parser.add_argument('--memory-tolerance', type=float, default=0.1, help='allowed fractional memory increase')
+    parser.add_argument('--baselines', default=BASELINE_FILE, help='baseline results file')
+    parser.add_argument('--save', action='store_true', help='save results as the baselines')
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.benchmarks, args.families, args.scales, args.repeat)
+
+    baselines = {}
+    if os.path.exists(args.baselines):
+        with open(args.baselines) as f:
+            baselines = json.load(f)
+
+    if args.save:
+        baselines.update(results)
+        with open(args.baselines, 'w') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+        print('Saved {0} results to {1}'.format(len(results), args.baselines))
+        return 0
+
+    regressions = compare_with_baselines(
+        results,
+        baselines,
+        args.time_tolerance,
+        args.memory_tolerance,
+        args.min_time
+    )
+    for regression in regressions:
+        print('REGRESSION ' + regression)
+
+    missing = sorted(key for key in results if key not in baselines)
+    for key in missing:
+        print('WARNING no baseline for {0}'.format(key), file=sys.stderr)
+    if missing:
+        print('WARNING {0} of {1} results were not checked; run with --save to store baselines'.format(
+            len(missing), len(results)
+        ), file=sys.stderr)
+
+    if regressions:
+        return REGRESSIONS_FOUND
+    if missing:
+        return BASELINES_MISSING
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
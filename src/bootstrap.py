@@ -0,0 +1,168 @@
+"""
+    Confidence intervals for the expected number of steps before absorption of a
+    chain estimated from transition counts.
+
+    For example, with counts from an OnlineEstimator:
+        result = bootstrap_expected_steps(estimator.get_count_matrix(), n_resamples=5000)
+        lower, upper = result['percentiles']
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+METHODS = ('dirichlet', 'multinomial')
+
+# Approximate number of values in each batch of resampled transition matrices
+_BATCH_VALUES = 2 ** 22
+
+
+def bootstrap_expected_steps(
+    counts,
+    n_resamples=1000,
+    method='dirichlet',
+    prior=0,
+    percentiles=(2.5, 97.5),
+    processes=1,
+    batch_size=None,
+    seed=None,
+):
+    """
+        Resample a chain from a matrix of transition counts, where counts[i, j] is the
+        number of transitions observed from state i to j, and return percentiles of the
+        expected number of steps before absorption from each transient state.
+        States with no transitions out are absorbing.
+
+        With method 'dirichlet', each row of probabilities is drawn from its posterior,
+        Dirichlet(counts[i] + prior), so a positive prior allows transitions which were
+        never observed. With method 'multinomial', each row of counts is redrawn with the
+        same total, which is the parametric bootstrap, and prior is not used.
+
+        Resamples are solved in batches, of batch_size, spread over the given number of
+        processes. Results are reproducible for a given seed, whatever the number of
+        processes. Resamples in which some states can't reach an absorbing state are
+        left out of the percentiles and counted in failures.
+
+        Returns a dictionary of:
+            transient: the indices of the transient states
+            expected_steps: expected steps before absorption from each transient state, using the observed probabilities
+            percentiles: an array of the given percentiles, with a row for each percentile
+            failures: the number of resamples left out
+    """
+
+    if method not in METHODS:
+        raise ValueError('Unknown resampling method: {0}'.format(method))
+
+    counts = np.asarray(counts, dtype=float)
+    if counts.ndim != 2 or counts.shape[0] != counts.shape[1]:
+        raise ValueError('Counts must be a square matrix')
+    if (counts < 0).any():
+        raise ValueError('Counts must not be negative')
+
+    transient = np.flatnonzero(counts.sum(axis=1) > 0)
+    if len(transient) == len(counts):
+        raise ValueError('Counts have no absorbing states')
+
+    observed = counts[transient]
+    expected_steps = _solve_expected_steps((observed / observed.sum(axis=1)[:, None])[None], transient)[0]
+
+    if batch_size is None:
+        batch_size = max(1, _BATCH_VALUES // observed.size)
+    batch_sizes = [min(batch_size, n_resamples - start) for start in range(0, n_resamples, batch_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(batch_sizes))
+    jobs = [(observed, transient, method, prior, size, batch_seed) for size, batch_seed in zip(batch_sizes, seeds)]
+
+    if processes is None:
+        processes = os.cpu_count()
+
+    if processes > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(min(processes, len(jobs))) as executor:
+            samples = list(executor.map(_run_batch, jobs))
+    else:
+        samples = [_run_batch(job) for job in jobs]
+
+    samples = np.concatenate(samples) if samples else np.empty((0, len(transient)))
+    # Expected steps are at least 1, so anything else is from a (nearly) singular resample
+    valid = (np.isfinite(samples) & (samples >= 1)).all(axis=1)
+    if valid.any():
+        intervals = np.percentile(samples[valid], percentiles, axis=0)
+    else:
+        intervals = np.full((len(percentiles), len(transient)), np.nan)
+
+    return {
+        'transient': transient,
+        'expected_steps': expected_steps,
+        'percentiles': intervals,
+        'failures': int((~valid).sum()),
+    }
+
+
+def _run_batch(job):
+    observed, transient, method, prior, size, seed = job
+    rng = np.random.default_rng(seed)
+
+    if method == 'dirichlet':
+        probabilities = _sample_dirichlet(rng, observed, prior, size)
+    else:
+        probabilities = _sample_multinomial(rng, observed, size)
+
+    return _solve_expected_steps(probabilities, transient)
+
+
+def _sample_dirichlet(rng, observed, prior, size):
+    # Normalised gamma variables are Dirichlet distributed. Only draw the nonzero
+    # parameters, since rows of observed chains are usually sparse.
+    alpha = observed + prior
+    rows, columns = np.nonzero(alpha)
+    weights = np.zeros((size,) + alpha.shape)
+    weights[:, rows, columns] = rng.standard_gamma(alpha[rows, columns], size=(size, len(rows)))
+    totals = weights.sum(axis=2, keepdims=True)
+
+    # Rows may sum to zero if all their parameters are tiny
+    return np.divide(weights, totals, out=np.zeros_like(weights), where=totals > 0)
+
+
+def _sample_multinomial(rng, observed, size):
+    # Draw each row's counts as a sequence of binomials, for every row and resample at once
+    totals = np.maximum(np.rint(observed.sum(axis=1)), 1)
+    probabilities = observed / observed.sum(axis=1)[:, None]
+
+    remaining = np.broadcast_to(totals, (size, len(totals))).astype(np.int64)
+    remaining_probability = np.ones(len(totals))
+    resampled = np.zeros((size,) + observed.shape)
+
+    for j in np.flatnonzero(probabilities.any(axis=0)):
+        p = np.divide(
+            probabilities[:, j], remaining_probability,
+            out=np.ones(len(totals)), where=remaining_probability > probabilities[:, j]
+        )
+        drawn = rng.binomial(remaining, np.clip(p, 0, 1))
+        resampled[:, :, j] = drawn
+        remaining = remaining - drawn
+        remaining_probability = remaining_probability - probabilities[:, j]
+
+    # Normalise by the drawn totals, in case rounding left some counts undrawn
+    drawn_totals = resampled.sum(axis=2, keepdims=True)
+    return np.divide(resampled, drawn_totals, out=np.zeros_like(resampled), where=drawn_totals > 0)
+
+
+def _solve_expected_steps(probabilities, transient):
+    # Solve (I - Q)t = 1 for each matrix in the batch, giving inf where it is singular
+    size, t, _ = probabilities.shape
+    A = np.identity(t) - probabilities[:, :, transient]
+    b = np.ones((size, t, 1))
+
+    try:
+        return np.linalg.solve(A, b)[:, :, 0]
+    except np.linalg.LinAlgError:
+        pass
+
+    steps = np.empty((size, t))
+    for k in range(size):
+        try:
+            steps[k] = np.linalg.solve(A[k], b[k])[:, 0]
+        except np.linalg.LinAlgError:
+            steps[k] = np.inf
+
+    return steps
@@ -1,4 +1,5 @@
 from svg_element import SVG
+from instrumentation import phase
 from math import pi, cos, sin, atan2, hypot
 
 
@@ -28,12 +29,13 @@ def get_chain_svg(chain, **kwargs):
         chain.nodes[i].x = x * width
         chain.nodes[i].y = y * height
 
-    svg = SVG({ 'viewBox': view_box })
+    with phase('get_chain_svg.build', nodes=len(chain.nodes), edges=len(chain.edges)):
+        svg = SVG({ 'viewBox': view_box })
 
-    add_styles(svg)
-    add_arrows(svg)
-    add_nodes(svg, chain.nodes, node_r)
-    add_edges(svg, chain.edges, node_r, dx)
+        add_styles(svg)
+        add_arrows(svg)
+        add_nodes(svg, chain.nodes, node_r)
+        add_edges(svg, chain, node_r, dx)
 
     return svg
 
@@ -96,7 +98,7 @@ def add_nodes(svg, nodes, node_r):
             node.label)
 
 
-def add_edges(svg, edges, node_r, dx):
+def add_edges(svg, chain, node_r, dx):
     gap_angle = 24 * pi / 180
     loop_size = dx * 0.85
 
@@ -104,7 +106,7 @@ def add_edges(svg, edges, node_r, dx):
     start_r = node_r + 2
     end_r = node_r + 4
 
-    for edge in edges:
+    for edge in chain.edges:
         # Node coordinates
         nx1 = edge.from_node.x
         ny1 = edge.from_node.y
@@ -136,10 +138,10 @@ def add_edges(svg, edges, node_r, dx):
             node2 = edge.to_node
             angle = atan2(ny2 - ny1, nx2 - nx1)
 
-            # If any edges coming out of node 2 go to node 1,
+            # If there is an edge from node 2 to node 1,
             # then we have edges going in both directions
             # so draw a curved edge
-            if any(edge.to_node == node1 for edge in node2.edges_out):
+            if chain.has_edge(node2.index, node1.index):
                 sign = 1 if node1.x < node2.x else -1
                 delta_angle = sign * (-8 if cos(angle) > 0 else 8) * pi / 180
                 angle1 = angle + delta_angle
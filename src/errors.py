@@ -7,3 +7,26 @@ class MarkovChainPropertyError(Error):
 
     def __init__(self, message):
         self.message = message
+
+class InvalidProbabilitiesError(MarkovChainPropertyError):
+    """Exception raised when nodes' outgoing edge probabilities are not valid."""
+
+    def __init__(self, message, nodes):
+        self.message = message
+        self.nodes = nodes
+
+class DuplicateEdgeError(Error):
+    """Exception raised when adding an edge between two nodes which already have an edge."""
+
+    def __init__(self, message):
+        self.message = message
+
+class PrecisionWarning(UserWarning):
+    """Warning raised when a numerical result is less accurate than required."""
+    pass
+
+class ServiceBusyError(Error):
+    """Exception raised when an analysis service has too many requests waiting."""
+
+    def __init__(self, message):
+        self.message = message
@@ -0,0 +1,144 @@
+from collections import deque
+
+import numpy as np
+
+from markov_chain import MarkovChain
+
+# Rescale decayed counts before the weight of new events can overflow
+_MAX_SCALE = 1e100
+
+
+class OnlineEstimator:
+    """
+        Estimates transition probabilities from a stream of events, so a chain can
+        follow a process which changes over time.
+
+        With decay, each event's weight is multiplied by decay after every later event,
+        so a transition observed k events ago has weight decay ** k. With window, only
+        the most recent window events are counted. With neither, all events count equally.
+
+        Each event updates only the counts of the row it is from. The estimator keeps
+        the probabilities of each row, and get_chain only recalculates the rows which
+        have changed since the last call.
+    """
+
+    def __init__(self, states=None, decay=None, window=None):
+        if decay is not None and window is not None:
+            raise ValueError('Only one of decay and window can be given')
+        if decay is not None and not 0 < decay <= 1:
+            raise ValueError('Decay must be in (0, 1], not {0}'.format(decay))
+        if window is not None and window < 1:
+            raise ValueError('Window must be at least 1, not {0}'.format(window))
+
+        self.decay = decay
+        self.window = window
+
+        self.states = []
+        self._state_index = {}
+
+        # Counts[i] maps j to the scaled weight of transitions from state i to j
+        self._counts = []
+        self._totals = []
+
+        # Weight of the next event; the effective weight of a count is count / scale
+        self._scale = 1.0
+        self._events = deque()
+
+        # Tuples of (j, probability) for each row, and rows which have changed since they were calculated
+        self._rows = []
+        self._dirty = set()
+
+        self._previous = None
+
+        for state in states or []:
+            self._get_index(state)
+
+    def _get_index(self, state):
+        index = self._state_index.get(state)
+        if index is None:
+            index = self._state_index[state] = len(self.states)
+            self.states.append(state)
+            self._counts.append({})
+            self._totals.append(0)
+            self._rows.append(())
+        return index
+
+    def update(self, from_state, to_state):
+        """ Count one transition from from_state to to_state. """
+        i = self._get_index(from_state)
+        j = self._get_index(to_state)
+
+        if self.decay is not None and self.decay < 1:
+            self._scale /= self.decay
+            if self._scale > _MAX_SCALE:
+                self._rescale()
+
+        counts = self._counts[i]
+        counts[j] = counts.get(j, 0) + self._scale
+        self._totals[i] += self._scale
+        self._dirty.add(i)
+
+        if self.window is not None:
+            self._events.append((i, j))
+            if len(self._events) > self.window:
+                self._remove(*self._events.popleft())
+
+    def observe(self, state):
+        """ Observe the next state of a sequence, counting the transition from the previous state. """
+        if self._previous is not None:
+            self.update(self._previous, state)
+        else:
+            self._get_index(state)
+        self._previous = state
+
+    def end_sequence(self):
+        """ End the current sequence, so the next observed state starts a new one. """
+        self._previous = None
+
+    def _remove(self, i, j):
+        counts = self._counts[i]
+        counts[j] -= 1
+        if counts[j] == 0:
+            del counts[j]
+        self._totals[i] -= 1
+        self._dirty.add(i)
+
+    def _rescale(self):
+        # Divide every count by the scale, which doesn't change any probabilities
+        for i, counts in enumerate(self._counts):
+            for j in counts:
+                counts[j] /= self._scale
+            self._totals[i] /= self._scale
+        self._scale = 1.0
+
+    def get_count_matrix(self):
+        """ Return a matrix of the weighted number of transitions between each pair of states. """
+        n = len(self.states)
+        matrix = np.zeros((n, n))
+        for i, counts in enumerate(self._counts):
+            for j, count in counts.items():
+                matrix[i, j] = count
+        return matrix / self._scale
+
+    def get_chain(self):
+        """
+            Return a MarkovChain of the current transition probabilities, with the states
+            as node labels. States with no counted transitions out are absorbing.
+
+            Each call returns a new chain, which doesn't change with later events, so it
+            can be kept, changed or analysed while more events are counted. Only the rows
+            which have changed since the last call are recalculated.
+        """
+
+        for i in self._dirty:
+            counts = self._counts[i]
+            total = self._totals[i]
+            self._rows[i] = tuple((j, count / total) for j, count in counts.items())
+        self._dirty.clear()
+
+        chain = MarkovChain(self.states)
+        for i, row in enumerate(self._rows):
+            for j, probability in row:
+                chain.add_edge(i, j, probability)
+
+        return chain
@@ -0,0 +1,87 @@
+from decimal import Decimal
+from fractions import Fraction
+from functools import reduce
+from math import gcd
+from numbers import Rational
+
+
+def to_fraction(value):
+    """
+        Convert a probability to a Fraction without losing precision.
+        Rationals, such as ints and Fractions, and Decimals are converted exactly;
+        floats are converted from their shortest decimal representation, so 0.2
+        becomes 1/5 rather than the nearest binary value.
+    """
+
+    if isinstance(value, (Rational, Decimal)):
+        return Fraction(value)
+    return Fraction(repr(float(value)))
+
+
+def invert_exact(matrix):
+    """
+        Invert a square matrix of Fractions exactly.
+
+        Each row is scaled by the lowest common multiple of its denominators,
+        so the elimination runs entirely on Python ints using fraction-free
+        (Bareiss) Gauss-Jordan elimination. Every division in the elimination
+        is exact, so intermediate values stay the size of minors of the matrix
+        rather than growing with each step as they do with Fraction arithmetic.
+        Returns a list of lists of Fractions.
+    """
+
+    n = len(matrix)
+
+    # Scale each row to integers: A = diag(scales) * matrix
+    scales = []
+    rows = []
+    for i, row in enumerate(matrix):
+        row = [Fraction(value) for value in row]
+        scale = reduce(_lcm, (value.denominator for value in row), 1)
+        scales.append(scale)
+
+        # Augment with the identity so the right-hand side becomes the adjugate
+        augmented = [int(value * scale) for value in row] + [0] * n
+        augmented[n + i] = 1
+        rows.append(augmented)
+
+    width = 2 * n
+    previous_pivot = 1
+
+    for k in range(n):
+        # Find a row with a non-zero pivot
+        for r in range(k, n):
+            if rows[r][k] != 0:
+                break
+        else:
+            raise ZeroDivisionError('Matrix is singular')
+
+        if r != k:
+            rows[k], rows[r] = rows[r], rows[k]
+
+        pivot_row = rows[k]
+        pivot = pivot_row[k]
+
+        for i in range(n):
+            if i == k:
+                continue
+
+            row = rows[i]
+            factor = row[k]
+            for j in range(width):
+                row[j] = (pivot * row[j] - factor * pivot_row[j]) // previous_pivot
+            row[k] = 0
+
+        previous_pivot = pivot
+
+    # Each row is now d * e_i | adj(A)_i, so A^-1 = adj(A) / d.
+    # Since matrix = diag(scales)^-1 * A, matrix^-1 = A^-1 * diag(scales).
+    return [
+        [Fraction(rows[i][n + j] * scales[j], rows[i][i]) for j in range(n)]
+        for i in range(n)
+    ]
+
+
+def _lcm(a, b):
+    # math.lcm needs Python 3.9
+    return a * b // gcd(a, b)
@@ -0,0 +1,139 @@
+"""
+    Write chains in formats other tools can read: DOT, GraphML and CSV edge lists.
+
+    Each writer takes a filename or a text stream, and writes edges in chunks of
+    chunk_size, so memory use doesn't grow with the size of the chain. Float
+    probabilities are written as the repr of a Python float, so they are read back
+    exactly. DOT and edge lists write Fraction and Decimal probabilities exactly,
+    such as 1/3, but GraphML probabilities are doubles, so they are written as floats.
+"""
+
+import csv
+import gzip
+from contextlib import contextmanager
+from decimal import Decimal
+from fractions import Fraction
+from itertools import islice
+from xml.sax.saxutils import escape
+
+# Buffer size for files opened by the writers
+BUFFER_SIZE = 1 << 20
+
+
+def write_dot(chain, file, chunk_size=100000, name='chain'):
+    """ Write a chain as a DOT digraph, with nodes labelled and edges labelled with their probabilities. """
+    with _open(file) as f:
+        f.write('digraph {0} {{\n'.format(_quote_dot(name)))
+
+        for nodes in _chunks(chain.nodes, chunk_size):
+            f.write(''.join(
+                '  {0} [label={1}];\n'.format(node.index, _quote_dot(_get_label(node)))
+                for node in nodes
+            ))
+
+        for edges in _chunks(chain.edges, chunk_size):
+            f.write(''.join(
+                '  {0} -> {1} [label="{2}"];\n'.format(
+                    edge.from_node.index, edge.to_node.index, _format_probability(edge.probability)
+                )
+                for edge in edges
+            ))
+
+        f.write('}\n')
+
+
+def write_graphml(chain, file, chunk_size=100000):
+    """ Write a chain as GraphML, with a label for each node and probability for each edge. """
+    with _open(file) as f:
+        f.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+            '  <key id="label" for="node" attr.name="label" attr.type="string"/>\n'
+            '  <key id="probability" for="edge" attr.name="probability" attr.type="double"/>\n'
+            '  <graph edgedefault="directed">\n'
+        )
+
+        for nodes in _chunks(chain.nodes, chunk_size):
+            f.write(''.join(
+                '    <node id="n{0}"><data key="label">{1}</data></node>\n'.format(
+                    node.index, escape(_get_label(node))
+                )
+                for node in nodes
+            ))
+
+        for edges in _chunks(chain.edges, chunk_size):
+            f.write(''.join(
+                '    <edge source="n{0}" target="n{1}"><data key="probability">{2!r}</data></edge>\n'.format(
+                    edge.from_node.index, edge.to_node.index, float(edge.probability)
+                )
+                for edge in edges
+            ))
+
+        f.write('  </graph>\n</graphml>\n')
+
+
+def write_edge_list(chain, file, chunk_size=100000, compress=None, compresslevel=6):
+    """
+        Write a chain's edges as CSV with the columns from, to, from_label, to_label
+        and probability. Labels of unlabelled nodes are empty. The output is gzipped
+        if compress is True, or by default if the filename ends with .gz. The default
+        compresslevel is zlib's, which is several times faster than gzip's default of 9.
+    """
+
+    if compress is None:
+        compress = isinstance(file, str) and file.endswith('.gz')
+
+    with _open(file, compresslevel if compress else None) as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(('from', 'to', 'from_label', 'to_label', 'probability'))
+
+        for edges in _chunks(chain.edges, chunk_size):
+            writer.writerows(
+                (
+                    edge.from_node.index,
+                    edge.to_node.index,
+                    edge.from_node.label,
+                    edge.to_node.label,
+                    _format_probability(edge.probability),
+                )
+                for edge in edges
+            )
+
+
+@contextmanager
+def _open(file, compresslevel=None):
+    # Yield a text stream for a filename, gzipped if compresslevel is given and closed
+    # afterwards, or an existing stream
+    if not isinstance(file, str):
+        yield file
+    elif compresslevel is not None:
+        with gzip.open(file, 'wt', compresslevel=compresslevel, encoding='utf-8', newline='') as f:
+            yield f
+    else:
+        with open(file, 'w', encoding='utf-8', newline='', buffering=BUFFER_SIZE) as f:
+            yield f
+
+
+def _chunks(items, chunk_size):
+    # Yield lists of at most chunk_size items
+    iterator = iter(items)
+    chunk = list(islice(iterator, chunk_size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, chunk_size))
+
+
+def _format_probability(probability):
+    # Exact probabilities are written exactly, and others as the shortest repr of a float
+    if isinstance(probability, (Fraction, Decimal)):
+        return str(probability)
+    return repr(float(probability))
+
+
+def _get_label(node):
+    return str(node.label) if node.label is not None else str(node.index)
+
+
+def _quote_dot(text):
+    # DOT strings are double quoted with backslashes escaping quotes
+    return '"{0}"'.format(str(text).replace('\\', '\\\\').replace('"', '\\"'))
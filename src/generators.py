@@ -0,0 +1,104 @@
+"""
+    Generators for common families of chains. Each chain records its structure,
+    so analysis can use banded solvers rather than treating it as an arbitrary graph.
+"""
+
+from numbers import Number
+
+from markov_chain import MarkovChain
+
+
+def birth_death(n, birth, death, absorbing=(), labels=None):
+    """
+        Return a chain of n states in a line, which moves from state i to i + 1 with
+        probability birth and to i - 1 with probability death, and otherwise stays put.
+        Birth and death can be numbers or sequences of a probability for each state.
+        There are no births from the last state or deaths from the first. States in
+        absorbing have no edges, such as 0 and n - 1 for the gambler's ruin.
+    """
+
+    births = _get_probabilities(birth, n)
+    deaths = _get_probabilities(death, n)
+    absorbing = set(absorbing)
+
+    chain = MarkovChain(labels if labels is not None else n)
+    for i in range(n):
+        if i in absorbing:
+            continue
+
+        up = births[i] if i < n - 1 else 0
+        down = deaths[i] if i > 0 else 0
+        if up + down > 1:
+            raise ValueError('Probabilities out of state {0} sum to more than 1'.format(i))
+
+        if down:
+            chain.add_edge(i, i - 1, down)
+        if up + down < 1:
+            chain.add_edge(i, i, 1 - up - down)
+        if up:
+            chain.add_edge(i, i + 1, up)
+
+    chain.set_structure('birth_death', (1, 1))
+    return chain
+
+
+def corridor(n, forward, back=0):
+    """
+        Return a chain of n transient states in a corridor, which moves forward with
+        probability forward, back with probability back, and otherwise stays put,
+        and is absorbed by state n at the end of the corridor.
+    """
+    return birth_death(n + 1, forward, back, absorbing=[n])
+
+
+def grid_walk(rows, columns, absorbing=(), stay=0):
+    """
+        Return a random walk on a grid of rows by columns states, numbered row by row,
+        so the state in row y and column x is y * columns + x. The walk stays put with
+        probability stay, and otherwise moves to one of its neighbours with equal
+        probability. States in absorbing have no edges.
+    """
+
+    absorbing = set(absorbing)
+    chain = MarkovChain(['({0}, {1})'.format(x, y) for y in range(rows) for x in range(columns)])
+
+    for y in range(rows):
+        for x in range(columns):
+            i = y * columns + x
+            if i in absorbing:
+                continue
+
+            neighbours = []
+            if y > 0:
+                neighbours.append(i - columns)
+            if x > 0:
+                neighbours.append(i - 1)
+            if x < columns - 1:
+                neighbours.append(i + 1)
+            if y < rows - 1:
+                neighbours.append(i + columns)
+
+            if not neighbours:
+                chain.add_edge(i, i, 1)
+                continue
+
+            if stay:
+                chain.add_edge(i, i, stay)
+            for j in neighbours:
+                chain.add_edge(i, j, (1 - stay) / len(neighbours))
+
+    bandwidth = columns if rows > 1 else 1
+    chain.set_structure('grid_walk', (bandwidth, bandwidth))
+    return chain
+
+
+def _get_probabilities(probability, n):
+    # Return a list of n probabilities from a number, including Fractions and
+    # Decimals, or sequence
+    if isinstance(probability, Number):
+        return [probability] * n
+
+    probabilities = list(probability)
+    if len(probabilities) != n:
+        raise ValueError('Expected {0} probabilities, not {1}'.format(n, len(probabilities)))
+    return probabilities
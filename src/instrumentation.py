@@ -0,0 +1,205 @@
+"""
+    Opt-in timing of the slow phases of analysis and drawing.
+
+    Code marks phases with:
+        with phase('get_expected_steps.invert', size=t):
+            ...
+
+    Nothing is recorded unless a collector is registered, in which case each phase
+    is passed to every collector as a record dictionary of:
+        name: the phase name
+        time: wall time in seconds
+        allocations: change in the number of memory blocks allocated by Python
+        memory: change in traced memory in bytes, including numpy arrays, or None
+        peak_memory: the most memory in use during the phase, in bytes above its start, or None
+        sizes: the problem sizes given to phase
+
+    Memory is only traced, with tracemalloc, while a collector registered with
+    trace_memory=True is collecting, since tracing slows down everything it measures.
+
+    For example:
+        with collecting() as collector:
+            get_chain_svg(chain).write()
+        print(collector.report())
+"""
+
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Functions called with the record of each phase
+_collectors = []
+
+# Collectors which asked for memory to be traced
+_memory_collectors = []
+
+# Phases which are running, innermost last, so peaks can be passed to outer phases
+_active_phases = []
+
+# Whether tracemalloc was started here, so it should be stopped with the last collector
+_started_tracing = False
+
+
+class _NullPhase:
+    """ Phase used when nothing is collecting, which does nothing. """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class _Phase:
+    """ Phase which measures time and memory and passes them to the collectors. """
+
+    def __init__(self, name, sizes):
+        self.name = name
+        self.sizes = sizes
+
+    def __enter__(self):
+        self.start_memory = self.peak = 0
+        self.trace_memory = bool(_memory_collectors) and tracemalloc.is_tracing()
+        if self.trace_memory:
+            self.start_memory = tracemalloc.get_traced_memory()[0]
+            if _active_phases:
+                # Keep the outer phase's peak before resetting it
+                _active_phases[-1].peak = max(_active_phases[-1].peak, tracemalloc.get_traced_memory()[1])
+            if hasattr(tracemalloc, 'reset_peak'):
+                # Before Python 3.9, peaks are since tracing started, so can be too high
+                tracemalloc.reset_peak()
+
+        _active_phases.append(self)
+        self.start_blocks = sys.getallocatedblocks()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        elapsed = time.perf_counter() - self.start
+        allocations = sys.getallocatedblocks() - self.start_blocks
+        _active_phases.remove(self)
+
+        memory = peak_memory = None
+        if self.trace_memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            self.peak = max(self.peak, peak)
+            memory = current - self.start_memory
+            peak_memory = self.peak - self.start_memory
+            if _active_phases:
+                _active_phases[-1].peak = max(_active_phases[-1].peak, self.peak)
+
+        record = {
+            'name': self.name,
+            'time': elapsed,
+            'allocations': allocations,
+            'memory': memory,
+            'peak_memory': peak_memory,
+            'sizes': self.sizes,
+        }
+
+        for collector in list(_collectors):
+            collector(record)
+        return False
+
+
+def phase(name, **sizes):
+    """ Return a context manager which records the time taken by the code it wraps. """
+    if not _collectors:
+        return _NULL_PHASE
+    return _Phase(name, sizes)
+
+
+def add_collector(collector, trace_memory=False):
+    """ Start passing phase records to a function, and with trace_memory, start tracing memory if it isn't already. """
+    global _started_tracing
+    if trace_memory:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_tracing = True
+        _memory_collectors.append(collector)
+    _collectors.append(collector)
+
+
+def remove_collector(collector):
+    """ Stop passing phase records to a function, and stop tracing memory after the last collector which asked for it. """
+    global _started_tracing
+    _collectors.remove(collector)
+    if collector in _memory_collectors:
+        _memory_collectors.remove(collector)
+        if not _memory_collectors and _started_tracing:
+            tracemalloc.stop()
+            _started_tracing = False
+
+
+@contextmanager
+def collecting(collector=None, trace_memory=False):
+    """ Collect phase records while in the context, using a new Collector by default. """
+    if collector is None:
+        collector = Collector()
+
+    add_collector(collector, trace_memory)
+    try:
+        yield collector
+    finally:
+        remove_collector(collector)
+
+
+class Collector:
+    """ Stores phase records and summarises them. """
+
+    def __init__(self):
+        self.records = []
+
+    def __call__(self, record):
+        self.records.append(record)
+
+    def summary(self):
+        """
+            Return a dictionary mapping phase names to their count, total time, maximum time,
+            total allocations and peak memory, which is None if memory wasn't traced.
+        """
+        summary = {}
+        for record in self.records:
+            totals = summary.setdefault(record['name'], {
+                'count': 0,
+                'total_time': 0,
+                'max_time': 0,
+                'allocations': 0,
+                'peak_memory': None,
+            })
+            totals['count'] += 1
+            totals['total_time'] += record['time']
+            totals['max_time'] = max(totals['max_time'], record['time'])
+            totals['allocations'] += record['allocations']
+            if record['peak_memory'] is not None:
+                totals['peak_memory'] = max(totals['peak_memory'] or 0, record['peak_memory'])
+
+        return summary
+
+    def report(self):
+        """ Return a table of the summary, with the slowest phases first. """
+        summary = self.summary()
+        names = sorted(summary, key=lambda name: summary[name]['total_time'], reverse=True)
+        width = max([len(name) for name in names] + [5])
+
+        lines = ['{0: <{width}}  {1: >6}  {2: >10}  {3: >10}  {4: >12}  {5: >10}'.format(
+            'phase', 'count', 'total (s)', 'max (s)', 'allocations', 'peak (MB)', width=width
+        )]
+        for name in names:
+            totals = summary[name]
+            peak_memory = totals['peak_memory']
+            lines.append('{0: <{width}}  {1: >6d}  {2: >10.4f}  {3: >10.4f}  {4: >12d}  {5: >10}'.format(
+                name,
+                totals['count'],
+                totals['total_time'],
+                totals['max_time'],
+                totals['allocations'],
+                '{0:.3f}'.format(peak_memory / 1e6) if peak_memory is not None else '-',
+                width=width
+            ))
+
+        return '\n'.join(lines)
@@ -0,0 +1,29 @@
+import importlib
+import sys
+
+
+class LazyModule:
+    """
+        Stand-in for a module which imports it on first attribute access,
+        so modules that are slow to import are only loaded when they are used.
+    """
+
+    def __init__(self, name):
+        self.__name = name
+
+    def __getattr__(self, attribute):
+        # Only called for attributes not yet copied from the module
+        module = importlib.import_module(self.__name)
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attribute)
+
+    def __repr__(self):
+        return "<LazyModule {0}>".format(self.__name)
+
+
+def lazy_import(name):
+    """ Return a LazyModule for the named module, or the module itself if it is already imported. """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    return LazyModule(name)
@@ -0,0 +1,75 @@
+import numpy as np
+
+# dtypes which LAPACK, and so np.linalg, can solve with
+LAPACK_DTYPES = (np.dtype(np.float32), np.dtype(np.float64))
+
+
+def solve(A, B):
+    """
+        Solve AX = B in the dtype of A. Uses np.linalg for float32 and float64;
+        other dtypes, such as longdouble, which LAPACK doesn't support, are solved
+        with Gaussian elimination with partial pivoting.
+    """
+
+    if A.dtype in LAPACK_DTYPES:
+        return np.linalg.solve(A, B.astype(A.dtype, copy=False))
+    return _gaussian_solve(A, B)
+
+
+def inverse(A):
+    """ Return the inverse of A in the dtype of A. """
+    return solve(A, np.identity(A.shape[0], dtype=A.dtype))
+
+
+def _gaussian_solve(A, B):
+    A = np.array(A)
+    B = np.array(B, dtype=A.dtype)
+    vector = B.ndim == 1
+    if vector:
+        B = B[:, None]
+
+    n = A.shape[0]
+    for k in range(n):
+        # Swap the row with the largest value in column k into place
+        pivot = k + int(np.argmax(np.abs(A[k:, k])))
+        if A[pivot, k] == 0:
+            raise np.linalg.LinAlgError('Singular matrix')
+
+        if pivot != k:
+            A[[k, pivot]] = A[[pivot, k]]
+            B[[k, pivot]] = B[[pivot, k]]
+
+        # Eliminate column k from the rows below
+        factors = A[k + 1:, k] / A[k, k]
+        A[k + 1:, k:] -= np.outer(factors, A[k, k:])
+        B[k + 1:] -= np.outer(factors, B[k])
+
+    X = np.empty_like(B)
+    for k in range(n - 1, -1, -1):
+        X[k] = (B[k] - A[k, k + 1:].dot(X[k + 1:])) / A[k, k]
+
+    return X[:, 0] if vector else X
+
+
+def relative_residual(A, X, B):
+    """
+        Return the relative residual of a solution to AX = B,
+        ||AX - B|| / (||A|| ||X|| + ||B||), using infinity norms. This is computed in
+        longdouble, so it measures the accuracy of solutions in any lower precision.
+    """
+
+    A = np.asarray(A, dtype=np.longdouble)
+    X = np.asarray(X, dtype=np.longdouble)
+    B = np.asarray(B, dtype=np.longdouble)
+
+    def norm(M):
+        if M.size == 0:
+            return 0
+        if M.ndim == 1:
+            return np.abs(M).max()
+        return np.abs(M).sum(axis=1).max()
+
+    scale = norm(A) * norm(X) + norm(B)
+    if scale == 0:
+        return 0.0
+    return float(norm(A.dot(X) - B) / scale)
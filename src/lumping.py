@@ -0,0 +1,139 @@
+import numpy as np
+
+from markov_chain import MarkovChain
+
+
+def lump(chain, partition=None, decimals=10):
+    """
+        Reduce a chain by merging nodes with identical outgoing behaviour.
+
+        Finds the coarsest ordinary lumping which refines the initial partition,
+        so nodes in the same block have the same probability of moving to each block.
+        Partition is a list giving a block key for each node. By default, transient
+        nodes start in one block and each absorbing node in its own block, so
+        absorption probabilities can be recovered for each absorbing node.
+        Probabilities are compared after rounding to the given number of decimals.
+
+        Returns a tuple of the quotient chain and a mapping array, where mapping[i]
+        is the index of the node in the quotient chain containing node i.
+    """
+
+    n = len(chain.nodes)
+    if partition is None:
+        partition = [node.index if node.is_absorbing() else -1 for node in chain.nodes]
+
+    # Initial blocks
+    block_ids = {}
+    blocks = []
+    block_of = [0] * n
+    for index, key in enumerate(partition):
+        block_id = block_ids.get(key)
+        if block_id is None:
+            block_id = block_ids[key] = len(blocks)
+            blocks.append(set())
+        blocks[block_id].add(index)
+        block_of[index] = block_id
+
+    # Refine blocks using each block as a splitter. When a block is split, the
+    # nodes with edges into the splitter are moved out into new blocks, so the cost
+    # is proportional to the number of edges into the splitter. Unless the block is
+    # already waiting to be a splitter, its largest part isn't used as a splitter,
+    # since the probability of moving to it is the probability of moving to the
+    # original block minus the other parts.
+    splitters = list(range(len(blocks)))
+    waiting = set(splitters)
+
+    while splitters:
+        splitter = splitters.pop()
+        waiting.discard(splitter)
+
+        # Probability of moving from each node into the splitter block
+        weights = {}
+        for index in blocks[splitter]:
+            for edge in chain.nodes[index].edges_in:
+                from_index = edge.from_node.index
+                weights[from_index] = weights.get(from_index, 0) + edge.probability
+
+        # Group the nodes with edges into the splitter by their block and weight
+        touched = {}
+        for index, weight in weights.items():
+            touched.setdefault(block_of[index], {}).setdefault(round(weight, decimals), []).append(index)
+
+        for block_id, groups in touched.items():
+            block = blocks[block_id]
+            parts = sorted(groups.values(), key=len, reverse=True)
+            n_untouched = len(block) - sum(len(part) for part in parts)
+
+            if len(parts) == 1 and n_untouched == 0:
+                continue
+
+            # Nodes without edges into the splitter stay in the block. If there
+            # are none, the largest part stays instead.
+            if n_untouched == 0:
+                parts = parts[1:]
+            for part in parts:
+                block.difference_update(part)
+
+            new_ids = []
+            for part in parts:
+                new_id = len(blocks)
+                blocks.append(set(part))
+                for index in part:
+                    block_of[index] = new_id
+                new_ids.append(new_id)
+
+            if block_id in waiting or len(block) >= len(parts[0]):
+                # The remaining block is waiting or the largest part
+                new_splitters = new_ids
+            else:
+                # The first new block is the largest part
+                new_splitters = [block_id] + new_ids[1:]
+            splitters.extend(new_splitters)
+            waiting.update(new_splitters)
+
+    # Number blocks in order of their first node
+    order = sorted(range(len(blocks)), key=lambda block_id: min(blocks[block_id]))
+    renumber = {block_id: i for (i, block_id) in enumerate(order)}
+    mapping = [renumber[block_id] for block_id in block_of]
+
+    quotient = MarkovChain()
+    for block_id in order:
+        labels = set(chain.nodes[index].label for index in blocks[block_id])
+        quotient.add_node(labels.pop() if len(labels) == 1 else None)
+
+    # Every node in a block has the same edges to blocks, so use the first
+    for block_id in order:
+        node = chain.nodes[min(blocks[block_id])]
+        for edge in node.edges_out:
+            quotient.add_edge(renumber[block_id], mapping[edge.to_node.index], edge.probability)
+
+    return quotient, np.array(mapping, dtype=int)
+
+
+def lift(values, mapping, nodes=None, quotient_nodes=None, axis=0):
+    """
+        Map values calculated for nodes of a quotient chain back to the original nodes.
+
+        By default values are indexed by every quotient node and the result by every
+        original node. Results which cover only some nodes, such as those indexed by
+        transient nodes, need the indices of the nodes the values and the result cover:
+
+            steps = quotient.get_expected_steps_before_absorption()
+            lift(steps, mapping, chain_transient_indices, quotient_transient_indices)
+    """
+
+    values = np.asarray(values)
+    mapping = np.asarray(mapping)
+
+    if nodes is not None:
+        mapping = mapping[nodes]
+
+    if quotient_nodes is not None:
+        # Position of each quotient node along the values axis
+        quotient_nodes = np.asarray(quotient_nodes, dtype=int)
+        size = max(mapping.max(initial=-1), quotient_nodes.max(initial=-1)) + 1
+        positions = np.full(size, -1)
+        positions[quotient_nodes] = np.arange(len(quotient_nodes))
+        mapping = positions[mapping]
+
+    return np.take(values, mapping, axis=axis)
@@ -1,15 +1,43 @@
-import numpy as np
+import time
+import warnings
 from collections import defaultdict
 
-from errors import MarkovChainPropertyError
+from errors import MarkovChainPropertyError, InvalidProbabilitiesError, DuplicateEdgeError, PrecisionWarning
+from instrumentation import phase
+from lazy import lazy_import
+
+# Numerical libraries are slow to import, so only load them when needed
+np = lazy_import('numpy')
+sparse = lazy_import('scipy.sparse')
+csgraph = lazy_import('scipy.sparse.csgraph')
+sparse_linalg = lazy_import('scipy.sparse.linalg')
+rational = lazy_import('exact')
+dense_linalg = lazy_import('linalg')
+scipy_linalg = lazy_import('scipy.linalg')
 
 
 class MarkovChain:
     """A Markov chain, consisting of nodes and edges."""
 
-    def __init__(self, nodes=None, edges=None):
+    # How to combine an edge with an existing edge between the same nodes
+    DUPLICATE_POLICIES = ('sum', 'replace', 'error')
+
+    def __init__(self, nodes=None, edges=None, duplicates='sum'):
+        if duplicates not in self.DUPLICATE_POLICIES:
+            raise ValueError('Unknown duplicate edge policy: {0}'.format(duplicates))
+
         self.nodes = []
         self.edges = []
+        self.duplicates = duplicates
+
+        # Map (from index, to index) to the edge between those nodes
+        self._edge_index = {}
+
+        # Incremented whenever the chain is changed through its methods
+        self.version = 0
+
+        # Version of the chain and the structure recorded for it by set_structure
+        self._structure = None
 
         if nodes:
             self.add_nodes(nodes)
@@ -29,6 +57,7 @@ class MarkovChain:
     def add_node(self, label=None):
         n = len(self.nodes)
         self.nodes.append(Node(n, label))
+        self.version += 1
 
     def add_nodes(self, nodes):
         if type(nodes) == int:
@@ -39,19 +68,173 @@ class MarkovChain:
                 self.add_node(label)
 
     def add_edge(self, index1, index2, probability=1):
+        """
+            Add an edge between two nodes and return it. If there is already an edge
+            between the nodes, it is combined with the new one according to the
+            chain's duplicates policy.
+        """
+
         # TODO test index exists
         node1 = self.nodes[index1]
         node2 = self.nodes[index2]
 
+        self.version += 1
+
+        key = (node1.index, node2.index)
+        edge = self._edge_index.get(key)
+        if edge is not None:
+            self._combine_edge(edge, probability, self.duplicates)
+            return edge
+
         edge = Edge(node1, node2, probability)
+        self._edge_index[key] = edge
         self.edges.append(edge)
         node1.edges_out.append(edge)
         node2.edges_in.append(edge)
+        return edge
 
     def add_edges(self, edges):
         for edge in edges:
             self.add_edge(*edge)
 
+    def set_structure(self, family, bandwidth):
+        """
+            Record that the chain belongs to a family of chains with a known structure,
+            such as a birth-death chain. Bandwidth is a tuple of the number of diagonals
+            below and above the main diagonal of the transition matrix which can be nonzero,
+            which lets some methods use banded solvers. The structure is forgotten when
+            the chain is changed.
+        """
+        self._structure = (self.version, {'family': family, 'bandwidth': tuple(bandwidth)})
+
+    @property
+    def structure(self):
+        """ The structure recorded with set_structure, or None if the chain has changed since. """
+        if self._structure is None or self._structure[0] != self.version:
+            return None
+        return self._structure[1]
+
+    def has_edge(self, index1, index2):
+        """ Return True if there is an edge from node index1 to node index2. """
+        return (index1, index2) in self._edge_index
+
+    def get_edge(self, index1, index2):
+        """ Return the edge from node index1 to node index2, or None if there isn't one. """
+        return self._edge_index.get((index1, index2))
+
+    def remove_edge(self, index1, index2):
+        """ Remove the edge from node index1 to node index2. This takes O(E) time. """
+        edge = self._edge_index.pop((index1, index2))
+        self.edges.remove(edge)
+        edge.from_node.edges_out.remove(edge)
+        edge.to_node.edges_in.remove(edge)
+        self.version += 1
+
+    def coalesce_edges(self, duplicates=None):
+        """
+            Combine any edges between the same pair of nodes, for example where edges
+            have been appended to chain.edges directly, and rebuild the edge index.
+            Uses the chain's duplicates policy unless another is given.
+        """
+
+        if duplicates is None:
+            duplicates = self.duplicates
+
+        edge_index = {}
+        edges = []
+        for edge in self.edges:
+            key = (edge.from_node.index, edge.to_node.index)
+            existing_edge = edge_index.get(key)
+            if existing_edge is None:
+                edge_index[key] = edge
+                edges.append(edge)
+            else:
+                self._combine_edge(existing_edge, edge.probability, duplicates)
+
+        # Remove edges that have been merged from the nodes
+        if len(edges) < len(self.edges):
+            kept = set(edges)
+            for node in self.nodes:
+                node.edges_in = [edge for edge in node.edges_in if edge in kept]
+                node.edges_out = [edge for edge in node.edges_out if edge in kept]
+
+        self.edges = edges
+        self._edge_index = edge_index
+        self.version += 1
+
+    def subchain(self, indices, renormalise=False):
+        """
+            Return a new chain of the given nodes, in the given order, with the edges
+            between them. The node at position i of indices becomes node i of the subchain.
+            If renormalise is True, outgoing probabilities are scaled to sum to 1.
+        """
+
+        indices = list(dict.fromkeys(indices))
+        remap = np.full(len(self.nodes), -1)
+        remap[indices] = np.arange(len(indices))
+
+        from_indices, to_indices, _ = self.get_edge_arrays()
+        new_from = remap[from_indices]
+        new_to = remap[to_indices]
+        kept = np.flatnonzero((new_from != -1) & (new_to != -1))
+
+        chain = MarkovChain(duplicates=self.duplicates)
+        for index in indices:
+            chain.add_node(self.nodes[index].label)
+
+        for k, i, j in zip(kept.tolist(), new_from[kept].tolist(), new_to[kept].tolist()):
+            chain.add_edge(i, j, self.edges[k].probability)
+
+        if renormalise:
+            chain.normalise()
+
+        return chain
+
+    def remove_nodes(self, indices):
+        """
+            Remove nodes and any edges to or from them. The remaining nodes keep their order
+            but are re-indexed. Returns an array mapping old node indices to new indices,
+            with -1 for removed nodes.
+        """
+
+        removed = np.zeros(len(self.nodes), dtype=bool)
+        removed[list(indices)] = True
+        remap = np.cumsum(~removed) - 1
+        remap[removed] = -1
+
+        self.nodes = [node for node in self.nodes if not removed[node.index]]
+        for node in self.nodes:
+            node.index = int(remap[node.index])
+
+        # Removed nodes no longer have an index in self.nodes
+        kept_nodes = set(self.nodes)
+        self.edges = [
+            edge for edge in self.edges
+            if edge.from_node in kept_nodes and edge.to_node in kept_nodes
+        ]
+        for node in self.nodes:
+            node.edges_in = [edge for edge in node.edges_in if edge.from_node in kept_nodes]
+            node.edges_out = [edge for edge in node.edges_out if edge.to_node in kept_nodes]
+
+        self._edge_index = {
+            (edge.from_node.index, edge.to_node.index): edge for edge in self.edges
+        }
+        self.version += 1
+        return remap
+
+    def _combine_edge(self, edge, probability, duplicates):
+        if duplicates == 'sum':
+            edge.probability += probability
+        elif duplicates == 'replace':
+            edge.probability = probability
+        else:
+            raise DuplicateEdgeError(
+                'Chain already has an edge from {0} to {1}'.format(
+                    edge.from_node.index,
+                    edge.to_node.index
+                )
+            )
+
     def is_connected(self):
         """ Return true if all the nodes are connected to each other. """
 
@@ -81,26 +264,458 @@ class MarkovChain:
         """ Return true if any nodes have no outgoing edges. """
         return any(node.is_absorbing() for node in self.nodes)
 
-    def get_transition_matrix(self):
+    def classify(self):
+        """
+            Classify the chain's nodes into communicating classes in O(V + E) time.
+            Returns a dictionary of:
+                labels: array of the class index of each node
+                recurrent: boolean array showing which classes have no edges leaving them
+                periods: array of the period of each class, or 0 for transient classes with no cycles
+                irreducible: True if every node can reach every other node
+                aperiodic: True if every recurrent class has period 1
+                ergodic: True if the chain is irreducible and aperiodic
+                absorbing: True if any node has no outgoing edges
+            Nodes with no outgoing edges are treated as having a loop back to themselves.
+        """
+
+        n = len(self.nodes)
+        from_indices, to_indices, probabilities = self.get_edge_arrays()
+
+        # Edges with zero probability are never followed
+        used = probabilities > 0
+        from_indices = from_indices[used]
+        to_indices = to_indices[used]
+
+        graph = sparse.csr_matrix((np.ones(len(from_indices)), (from_indices, to_indices)), shape=(n, n))
+        n_classes, labels = csgraph.connected_components(graph, directed=True, connection='strong')
+
+        from_labels = labels[from_indices]
+        within_class = from_labels == labels[to_indices]
+
+        # A class is recurrent if no edges leave it
+        leaving = np.bincount(from_labels[~within_class], minlength=n_classes)
+        recurrent = leaving == 0
+
+        periods = _get_class_periods(
+            labels,
+            n_classes,
+            from_indices[within_class],
+            to_indices[within_class]
+        )
+
+        # Absorbing nodes implicitly stay where they are, so have period 1
+        has_edges = np.bincount(from_indices, minlength=n) > 0
+        periods[labels[~has_edges]] = 1
+
+        aperiodic = bool(np.all(periods[recurrent] == 1))
+        irreducible = n_classes <= 1
+
+        return {
+            'labels': labels,
+            'recurrent': recurrent,
+            'periods': periods,
+            'irreducible': irreducible,
+            'aperiodic': aperiodic,
+            'ergodic': irreducible and aperiodic,
+            'absorbing': not has_edges.all(),
+        }
+
+    def validate(self, tolerance=1e-8):
+        """
+            Raise an InvalidProbabilitiesError listing every node with a negative outgoing
+            edge probability, or whose outgoing probabilities don't sum to 1.
+            Absorbing nodes, with no outgoing edges, are valid.
+        """
+
+        from_indices, _, probabilities = self.get_edge_arrays()
+        n = len(self.nodes)
+        totals = np.bincount(from_indices, weights=probabilities, minlength=n)
+        has_edges = np.bincount(from_indices, minlength=n) > 0
+        has_negative = np.bincount(from_indices, weights=probabilities < 0, minlength=n) > 0
+
+        invalid = has_negative | (has_edges & (np.abs(totals - 1) > tolerance))
+        nodes = np.flatnonzero(invalid).tolist()
+
+        if nodes:
+            shown = ', '.join(str(index) for index in nodes[:10])
+            if len(nodes) > 10:
+                shown += ', ...'
+            raise InvalidProbabilitiesError(
+                '{0} nodes have invalid probabilities: {1}'.format(len(nodes), shown),
+                nodes
+            )
+
+    def normalise(self):
+        """ Scale outgoing edge probabilities so they sum to 1 for every node with a non-zero total. """
+        from_indices, _, probabilities = self.get_edge_arrays()
+        totals = np.bincount(from_indices, weights=probabilities, minlength=len(self.nodes))
+
+        edge_totals = totals[from_indices]
+        probabilities = np.divide(probabilities, edge_totals, out=probabilities, where=edge_totals != 0)
+
+        for edge, probability in zip(self.edges, probabilities.tolist()):
+            edge.probability = probability
+        self.version += 1
+
+    def get_transition_matrix(self, dtype=float):
         n = len(self.nodes)
         if n == 0:
             return []
         
-        matrix = np.zeros((n, n))
+        matrix = np.zeros((n, n), dtype=dtype)
 
         for edge in self.edges:
             i = edge.from_node.index
             j = edge.to_node.index
-            matrix[i, j] = edge.probability
+            matrix[i, j] += edge.probability
 
         return matrix
 
-    def get_expected_steps(self):
-        if not self.is_absorbing():
-            raise MarkovChainPropertyError('Chain is not absorbing')
+    def get_edge_arrays(self, dtype=float):
+        """
+            Return arrays of the from node indices, to node indices and probabilities of every edge,
+            with probabilities of the given dtype.
+        """
+        n = len(self.edges)
+        from_indices = np.fromiter((edge.from_node.index for edge in self.edges), dtype=np.intp, count=n)
+        to_indices = np.fromiter((edge.to_node.index for edge in self.edges), dtype=np.intp, count=n)
+        probabilities = np.fromiter((edge.probability for edge in self.edges), dtype=dtype, count=n)
+        return from_indices, to_indices, probabilities
+
+    def get_sparse_transition_matrix(self, dtype=float):
+        """ Return the transition matrix as a scipy CSR matrix. """
+        n = len(self.nodes)
+        from_indices, to_indices, probabilities = self.get_edge_arrays(dtype)
+        return sparse.csr_matrix((probabilities, (from_indices, to_indices)), shape=(n, n))
+
+    def _get_stochastic_matrix(self, dtype=float):
+        # Sparse transition matrix where absorbing nodes have a loop back to themselves
+        P = self.get_sparse_transition_matrix(dtype)
+        absorbing = np.diff(P.indptr) == 0
+        if absorbing.any():
+            P = (P + sparse.diags(absorbing.astype(dtype))).tocsr()
+        return P
+
+    def get_n_step_distribution(self, start, steps, dtype=float):
+        """
+            Return the distribution over nodes after a number of steps.
+            Start can be a node index or an initial distribution.
+        """
+
+        P = self._get_stochastic_matrix(dtype)
+        distribution = _get_start_distribution(start, len(self.nodes), dtype)
+
+        PT = P.T.tocsr()
+        for _ in range(steps):
+            distribution = PT.dot(distribution)
+        return distribution
+
+    def get_stationary_distribution(self, tolerance=1e-12, max_iterations=100000, dtype=float, time_limit=None):
+        """
+            Return the stationary distribution of an irreducible chain using power iteration,
+            stopping after max_iterations iterations or time_limit seconds.
+            Periodic chains are iterated using the lazy chain, (I + P) / 2, which has
+            the same stationary distribution but converges.
+            Chains with a banded structure are solved directly instead.
+        """
+        return self._solve_stationary_distribution(tolerance, max_iterations, dtype, time_limit)[0]
+
+    def _solve_stationary_distribution(self, tolerance=1e-12, max_iterations=100000, dtype=float, time_limit=None):
+        # Return the stationary distribution and whether it converged
+        start_time = time.perf_counter()
+        classification = self.classify()
+        if not classification['irreducible']:
+            raise MarkovChainPropertyError('Chain is not irreducible')
 
-        if not self.is_connected():
-            raise MarkovChainPropertyError('Chain is disjoint')
+        n = len(self.nodes)
+        if self._has_banded_structure(dtype):
+            with phase('get_stationary_distribution.solve_banded', size=n):
+                return self._get_banded_stationary_distribution(dtype), True
+
+        P = self._get_stochastic_matrix(dtype)
+        if not classification['aperiodic']:
+            P = (P + sparse.identity(n, format='csr', dtype=dtype)) / 2
+
+        PT = P.T.tocsr()
+        distribution = np.full(n, 1 / n, dtype=dtype)
+        converged = False
+        for _ in range(max_iterations):
+            next_distribution = PT.dot(distribution)
+            converged = np.abs(next_distribution - distribution).sum() < tolerance
+            distribution = next_distribution
+            if converged:
+                break
+            if time_limit is not None and time.perf_counter() - start_time > time_limit:
+                break
+
+        return distribution / distribution.sum(), bool(converged)
+
+    def _get_banded_stationary_distribution(self, dtype):
+        n = len(self.nodes)
+        if n == 1:
+            return np.ones(1, dtype=dtype)
+
+        from_indices, to_indices, probabilities = self.get_edge_arrays(dtype)
+
+        if self.structure['bandwidth'] == (1, 1):
+            # Tridiagonal chains are reversible, so pi[i + 1] / pi[i] = P[i, i + 1] / P[i + 1, i]
+            up = np.zeros(n - 1, dtype=dtype)
+            down = np.zeros(n - 1, dtype=dtype)
+            forward = to_indices == from_indices + 1
+            backward = from_indices == to_indices + 1
+            up[from_indices[forward]] = probabilities[forward]
+            down[to_indices[backward]] = probabilities[backward]
+
+            # Sum logs to avoid overflow in long chains
+            log_distribution = np.concatenate(([0], np.cumsum(np.log(up) - np.log(down))))
+            distribution = np.exp(log_distribution - log_distribution.max())
+            return distribution / distribution.sum()
+
+        # Solve (P^T - I)pi = 0 with pi[0] = 1, which has P's bandwidth reversed
+        lower, upper = self.structure['bandwidth']
+        rows = np.concatenate((to_indices, np.arange(n)))
+        columns = np.concatenate((from_indices, np.arange(n)))
+        values = np.concatenate((probabilities, -np.ones(n, dtype=dtype)))
+
+        first = columns == 0
+        b = np.zeros(n, dtype=dtype)
+        np.add.at(b, rows[first], -values[first])
+
+        kept = (rows > 0) & ~first
+        distribution = np.ones(n, dtype=dtype)
+        distribution[1:] = _solve_banded(rows[kept] - 1, columns[kept] - 1, values[kept], n - 1, (upper, lower), b[1:])
+        return distribution / distribution.sum()
+
+    def is_reversible(self, tolerance=1e-10, max_iterations=100000, time_limit=None):
+        """
+            Return True if the chain is irreducible and satisfies detailed balance.
+            The stationary distribution is found within max_iterations and time_limit.
+        """
+        return self._check_reversible(tolerance, max_iterations, time_limit)[0]
+
+    def _check_reversible(self, tolerance=1e-10, max_iterations=100000, time_limit=None):
+        # Return whether the chain is reversible, its stationary distribution if it is
+        # irreducible, and whether that converged
+        if not self.classify()['irreducible']:
+            return False, None, True
+
+        pi, converged = self._solve_stationary_distribution(max_iterations=max_iterations, time_limit=time_limit)
+        flow = sparse.diags(pi).dot(self._get_stochastic_matrix())
+        return abs(flow - flow.T).max() <= tolerance, pi, converged
+
+    def get_spectral_gap(self, reversible=None, max_iterations=None, tolerance=0, time_limit=None):
+        """
+            Estimate the second largest eigenvalue modulus (SLEM) of the transition matrix
+            using a sparse iterative eigensolver, limited to max_iterations.
+            For reversible chains, Lanczos iteration is used on the symmetrised matrix.
+            Whether the chain is reversible is tested if not given.
+            The stationary distributions this needs are found by power iteration limited
+            to max_iterations and time_limit seconds; the time limit can't interrupt the
+            eigensolver itself.
+
+            Returns a dictionary of slem, spectral_gap (1 - slem), relaxation_time (1 / gap)
+            and converged, which is False if any solver ran out of iterations or time.
+            If too few eigenvalues converged to estimate the SLEM, the estimates are None.
+        """
+
+        start_time = time.perf_counter()
+        n = len(self.nodes)
+        P = self._get_stochastic_matrix()
+        stationary_iterations = max_iterations if max_iterations is not None else 100000
+        pi = None
+        converged = True
+
+        def remaining_time():
+            if time_limit is None:
+                return None
+            return max(time_limit - (time.perf_counter() - start_time), 0)
+
+        if reversible is None:
+            reversible, pi, converged = self._check_reversible(
+                max_iterations=stationary_iterations, time_limit=remaining_time()
+            )
+
+        try:
+            if n < 4:
+                # The sparse solvers need more nodes than eigenvalues required
+                eigenvalues = np.linalg.eigvals(P.toarray())
+            elif reversible:
+                # S = D^1/2 P D^-1/2 is symmetric with the same eigenvalues as P
+                if pi is None:
+                    pi, converged = self._solve_stationary_distribution(
+                        max_iterations=stationary_iterations, time_limit=remaining_time()
+                    )
+                root_pi = np.sqrt(pi)
+                S = sparse.diags(root_pi).dot(P).dot(sparse.diags(1 / root_pi))
+                S = (S + S.T) / 2
+                eigenvalues = sparse_linalg.eigsh(S, k=2, which='LM', maxiter=max_iterations, tol=tolerance, return_eigenvectors=False)
+            else:
+                eigenvalues = sparse_linalg.eigs(P.T, k=2, which='LM', maxiter=max_iterations, tol=tolerance, return_eigenvectors=False)
+        except sparse_linalg.ArpackNoConvergence as error:
+            eigenvalues = error.eigenvalues
+            converged = False
+
+        moduli = np.sort(np.abs(eigenvalues))[::-1]
+        if len(moduli) < 2 and n > 1:
+            return {'slem': None, 'spectral_gap': None, 'relaxation_time': None, 'converged': False}
+
+        slem = min(float(moduli[1]), 1.0) if len(moduli) > 1 else 0.0
+        gap = 1 - slem
+
+        return {
+            'slem': slem,
+            'spectral_gap': gap,
+            'relaxation_time': 1 / gap if gap > 0 else float('inf'),
+            'converged': converged,
+        }
+
+    def get_mixing_time(self, epsilon=0.25, starts=None, max_steps=10000, time_limit=None, batch_size=64):
+        """
+            Estimate the mixing time of an ergodic chain: the number of steps until the
+            total variation distance between the n-step distribution and the stationary
+            distribution is at most epsilon for every start node.
+            Start nodes default to all nodes, and are iterated batch_size at a time, so
+            memory use is proportional to the number of nodes times batch_size.
+            Stops after max_steps steps or time_limit seconds.
+            Returns a dictionary of mixing_time (None if not reached), steps and distance,
+            the worst total variation distance at the last step of the slowest batch.
+        """
+
+        if not self.classify()['ergodic']:
+            raise MarkovChainPropertyError('Chain is not ergodic')
+
+        start_time = time.perf_counter()
+        n = len(self.nodes)
+        pi = self.get_stationary_distribution()
+        PT = self._get_stochastic_matrix().T.tocsr()
+
+        if starts is None:
+            starts = np.arange(n)
+        starts = np.asarray(starts)
+
+        result = {'mixing_time': 0, 'steps': 0, 'distance': 0.0}
+        for batch_start in range(0, len(starts), batch_size):
+            batch = starts[batch_start:batch_start + batch_size]
+
+            # One column per start node
+            distributions = np.zeros((n, len(batch)))
+            distributions[batch, np.arange(len(batch))] = 1
+
+            steps = 0
+            while True:
+                distance = float(0.5 * np.abs(distributions - pi[:, None]).sum(axis=0).max())
+                if distance <= epsilon:
+                    break
+
+                out_of_time = time_limit is not None and time.perf_counter() - start_time > time_limit
+                if steps >= max_steps or out_of_time:
+                    return {'mixing_time': None, 'steps': steps, 'distance': distance}
+
+                distributions = PT.dot(distributions)
+                steps += 1
+
+            # Distance from the stationary distribution never increases, so the
+            # mixing time is the slowest batch's
+            if steps >= result['steps']:
+                result = {'mixing_time': steps, 'steps': steps, 'distance': distance}
+
+        return result
+
+    def get_hitting_times(self, targets, dtype=float):
+        """
+            Return an array of the expected number of steps to reach any of the target
+            nodes from each node. Targets are treated as absorbing, without changing the chain.
+            Nodes which have a non-zero probability of never reaching a target have
+            an infinite expected number of steps.
+            The sparse solver only supports float32 and float64, so other dtypes use a dense solve.
+        """
+
+        n = len(self.nodes)
+        is_target = np.zeros(n, dtype=bool)
+        is_target[list(targets)] = True
+
+        from_indices, to_indices, probabilities = self.get_edge_arrays(dtype)
+
+        # Edges with zero probability are never followed
+        used = probabilities > 0
+        from_indices = from_indices[used]
+        to_indices = to_indices[used]
+        probabilities = probabilities[used]
+
+        # Nodes that can reach a target: search backwards from the targets
+        can_reach = _get_reachable(is_target, to_indices, from_indices, n)
+
+        # Nodes that can reach a node which can't reach a target, without first
+        # passing through a target, may never reach the target
+        leaving_target = is_target[from_indices]
+        may_not_reach = _get_reachable(
+            ~can_reach,
+            to_indices[~leaving_target],
+            from_indices[~leaving_target],
+            n
+        )
+
+        hitting_times = np.full(n, np.inf, dtype=dtype)
+        hitting_times[is_target] = 0
+
+        # Solve (I - Q)h = 1 for the nodes which reach a target with probability 1
+        solve_indices = np.flatnonzero(~is_target & ~may_not_reach)
+        t = len(solve_indices)
+        if t == 0:
+            return hitting_times
+
+        map_indices = np.full(n, -1)
+        map_indices[solve_indices] = np.arange(t)
+        i = map_indices[from_indices]
+        j = map_indices[to_indices]
+        inside = (i != -1) & (j != -1)
+
+        Q = sparse.csc_matrix((probabilities[inside], (i[inside], j[inside])), shape=(t, t))
+        A = sparse.identity(t, format='csc', dtype=dtype) - Q
+        b = np.ones(t, dtype=dtype)
+
+        if A.dtype in dense_linalg.LAPACK_DTYPES:
+            hitting_times[solve_indices] = sparse_linalg.spsolve(A, b)
+        else:
+            hitting_times[solve_indices] = dense_linalg.solve(A.toarray(), b)
+        return hitting_times
+
+    def get_mean_first_passage_times(self):
+        """
+            Return a matrix, M, where M[i, j] is the expected number of steps to get
+            from node i to node j (so M[j, j] = 0).
+            This requires a sparse solve for each node, so use get_hitting_times
+            directly when only some of the columns are needed.
+        """
+
+        n = len(self.nodes)
+        M = np.empty((n, n))
+        for j in range(n):
+            M[:, j] = self.get_hitting_times([j])
+        return M
+
+    def get_expected_steps(self, exact=False, dtype=float, max_residual=None, return_residual=False):
+        """
+            Return the fundamental matrix, N = (I - Q)^-1, where Q is the matrix of
+            transitions between transient states.
+            If exact is True, probabilities are treated as rationals and N is
+            returned as an object array of Fractions.
+            Otherwise N is calculated with the given dtype, such as float32 to save
+            memory, or longdouble for ill-conditioned chains. If max_residual is given,
+            a PrecisionWarning is raised if the relative residual of N is larger.
+            If return_residual is True, a tuple of N and its relative residual is
+            returned, which is 0 for exact results.
+            For chains with a banded structure, N is found with a banded solver in
+            O(n^2) rather than O(n^3) time.
+        """
+
+        self._check_absorbing()
+
+        if not exact and self._has_banded_structure(dtype):
+            t = len([node for node in self.nodes if not node.is_absorbing()])
+            return self._solve_banded_transient_system(
+                np.identity(t, dtype=dtype), dtype, max_residual, return_residual
+            )
         
         # Get matrix of just transisition states
         transition_states = [node for node in self.nodes if not node.is_absorbing()]
@@ -109,21 +724,125 @@ class MarkovChain:
         map_indices = {node.index: i for (i, node) in enumerate(transition_states)}
 
         t = len(transition_states)
-        Q = np.zeros((t, t))
+
+        if exact:
+            N = self._get_exact_expected_steps(map_indices, t)
+            return (N, 0.0) if return_residual else N
+
+        with phase('get_expected_steps.build_matrix', nodes=len(self.nodes), edges=len(self.edges)):
+            Q = np.zeros((t, t), dtype=dtype)
+
+            for edge in self.edges:
+                i = map_indices.get(edge.from_node.index, -1)
+                j = map_indices.get(edge.to_node.index, -1)
+                if i != -1 and j != -1:
+                    Q[i, j] += edge.probability
+
+        with phase('get_expected_steps.invert', size=t):
+            A = np.identity(t, dtype=dtype) - Q
+            N = dense_linalg.inverse(A)
+
+        if max_residual is not None or return_residual:
+            residual = _check_residual(A, N, np.identity(t, dtype=dtype), max_residual)
+            if return_residual:
+                return N, residual
+        return N
+
+    def _check_absorbing(self):
+        if not self.is_absorbing():
+            raise MarkovChainPropertyError('Chain is not absorbing')
+
+        if not self.is_connected():
+            raise MarkovChainPropertyError('Chain is disjoint')
+
+    def _has_banded_structure(self, dtype):
+        # Banded solvers are only available for the dtypes LAPACK supports
+        return self.structure is not None and np.dtype(dtype) in dense_linalg.LAPACK_DTYPES
+
+    def _solve_banded_transient_system(self, B, dtype, max_residual, return_residual):
+        # Solve (I - Q)X = B for transient nodes, which keeps the chain's bandwidth
+        transient = np.array([not node.is_absorbing() for node in self.nodes])
+        remap = np.cumsum(transient) - 1
+        t = len(B)
+
+        from_indices, to_indices, probabilities = self.get_edge_arrays(dtype)
+        kept = transient[from_indices] & transient[to_indices]
+        rows = np.concatenate((remap[from_indices[kept]], np.arange(t)))
+        columns = np.concatenate((remap[to_indices[kept]], np.arange(t)))
+        values = np.concatenate((-probabilities[kept], np.ones(t, dtype=dtype)))
+
+        with phase('get_expected_steps.solve_banded', size=t, columns=B.shape[1]):
+            X = _solve_banded(rows, columns, values, t, self.structure['bandwidth'], B)
+
+        if max_residual is not None or return_residual:
+            A = np.zeros((t, t), dtype=dtype)
+            np.add.at(A, (rows, columns), values)
+            residual = _check_residual(A, X, B, max_residual)
+            if return_residual:
+                return X, residual
+        return X
+
+    def _get_exact_expected_steps(self, map_indices, t):
+        # Build I - Q with rational entries
+        matrix = [[0] * t for _ in range(t)]
+        for i in range(t):
+            matrix[i][i] = 1
 
         for edge in self.edges:
             i = map_indices.get(edge.from_node.index, -1)
             j = map_indices.get(edge.to_node.index, -1)
             if i != -1 and j != -1:
-                Q[i, j] = edge.probability
+                matrix[i][j] -= rational.to_fraction(edge.probability)
 
-        N = np.linalg.inv(np.identity(t) - Q)
+        with phase('get_expected_steps.invert_exact', size=t):
+            N = np.empty((t, t), dtype=object)
+            N[:, :] = rational.invert_exact(matrix)
         return N
 
-    def get_expected_steps_before_absorption(self):
-        N = self.get_expected_steps()
+    def get_expected_steps_before_absorption(self, exact=False, dtype=float, max_residual=None, return_residual=False):
+        """
+            Return a column vector of the expected number of steps before absorption from
+            each transient node. For chains with a banded structure, this is solved
+            directly in O(n) time for a fixed bandwidth. Max_residual and return_residual
+            are as for get_expected_steps.
+        """
+
+        if not exact and self._has_banded_structure(dtype):
+            self._check_absorbing()
+            t = len([node for node in self.nodes if not node.is_absorbing()])
+            return self._solve_banded_transient_system(
+                np.ones((t, 1), dtype=dtype), dtype, max_residual, return_residual
+            )
+
+        N = self.get_expected_steps(exact, dtype, max_residual, return_residual)
+        if return_residual:
+            N, residual = N
         size = N.shape[0]
-        return N.dot(np.ones((size, 1)))
+        ones = np.ones((size, 1), dtype=int if exact else dtype)
+        steps = N.dot(ones)
+        return (steps, residual) if return_residual else steps
+
+    def get_absorption_probabilities(self, exact=False, dtype=float):
+        """
+            Return a matrix, B, where B[i, j] is the probability of the ith transient
+            node being absorbed by the jth absorbing node.
+        """
+
+        N = self.get_expected_steps(exact, dtype)
+
+        transient_indices = [node.index for node in self.nodes if not node.is_absorbing()]
+        absorbing_indices = [node.index for node in self.nodes if node.is_absorbing()]
+        map_transient = {index: i for (i, index) in enumerate(transient_indices)}
+        map_absorbing = {index: j for (j, index) in enumerate(absorbing_indices)}
+
+        R = np.zeros((len(transient_indices), len(absorbing_indices)), dtype=object if exact else dtype)
+        for edge in self.edges:
+            i = map_transient.get(edge.from_node.index, -1)
+            j = map_absorbing.get(edge.to_node.index, -1)
+            if i != -1 and j != -1:
+                R[i, j] += rational.to_fraction(edge.probability) if exact else edge.probability
+
+        return N.dot(R)
 
     def set_node_depths(self):
         if not self.is_absorbing():
@@ -201,8 +920,9 @@ class MarkovChain:
         return node_descendants
 
     def get_node_positions(self):
-        self.set_node_depths()
-        depths = self._get_nodes_at_depth()
+        with phase('get_node_positions.set_node_depths', nodes=len(self.nodes), edges=len(self.edges)):
+            self.set_node_depths()
+            depths = self._get_nodes_at_depth()
 
         # Map node index to a coordinate in (0, 1)
         x_coords = [None] * len(self.nodes)
@@ -231,18 +951,19 @@ class MarkovChain:
         def get_mean_coordinate(nodes):
             return sum(y_coords[node.index] for node in nodes) / len(nodes)
 
-        while unset_nodes:
-            for node in unset_nodes:
-                children = node.get_children()
-                if all_coordinates_defined(children):
-                    y_coords[node.index] = get_mean_coordinate(children)
-                    continue
+        with phase('get_node_positions.y_coordinates', nodes=len(unset_nodes)):
+            while unset_nodes:
+                for node in unset_nodes:
+                    children = node.get_children()
+                    if all_coordinates_defined(children):
+                        y_coords[node.index] = get_mean_coordinate(children)
+                        continue
 
-                parents = node.get_parents()
-                if all_coordinates_defined(parents):
-                    y_coords[node.index] = get_mean_coordinate(parents)
+                    parents = node.get_parents()
+                    if all_coordinates_defined(parents):
+                        y_coords[node.index] = get_mean_coordinate(parents)
 
-            unset_nodes = set(node for node in self.nodes if y_coords[node.index] is None)
+                unset_nodes = set(node for node in self.nodes if y_coords[node.index] is None)
 
         positions = [(x, y) for (x, y) in zip(x_coords, y_coords)]
         return {
@@ -250,6 +971,103 @@ class MarkovChain:
             'dimensions': (n_depths, max_nodes_per_depth)
         }
 
+    def get_svg(self, **kwargs):
+        """ Return an SVG drawing of the chain, using the options of draw_svg.get_chain_svg. """
+        # Only load the drawing code when it's used
+        from draw_svg import get_chain_svg
+        return get_chain_svg(self, **kwargs)
+
+
+def _get_start_distribution(start, n, dtype=float):
+    # Convert a node index to a distribution, or copy a given distribution
+    if np.ndim(start) == 0:
+        distribution = np.zeros(n, dtype=dtype)
+        distribution[start] = 1
+        return distribution
+    return np.array(start, dtype=dtype)
+
+
+def _check_residual(A, X, B, max_residual):
+    # Return the relative residual of X as a solution to AX = B, warning if it is
+    # larger than max_residual
+    residual = float(dense_linalg.relative_residual(A, X, B))
+    if max_residual is not None and residual > max_residual:
+        warnings.warn(
+            'Relative residual {0:.3g} is larger than {1:.3g}'.format(residual, max_residual),
+            PrecisionWarning
+        )
+    return residual
+
+
+def _solve_banded(rows, columns, values, n, bandwidth, b):
+    # Solve Ax = b, where A is n by n with the given values at (rows, columns), all
+    # within bandwidth, a tuple of the number of diagonals below and above the main one
+    lower, upper = bandwidth
+    ab = np.zeros((lower + upper + 1, n), dtype=values.dtype)
+    np.add.at(ab, (upper + rows - columns, columns), values)
+    return scipy_linalg.solve_banded((lower, upper), ab, b)
+
+
+def _get_reachable(sources, from_indices, to_indices, n):
+    """
+        Return a boolean array showing which of the n nodes can be reached
+        from any source node, following edges from from_indices to to_indices.
+    """
+
+    # Search from an extra node, n, which has an edge to every source
+    sources = np.flatnonzero(sources)
+    rows = np.concatenate((from_indices, np.full(len(sources), n)))
+    columns = np.concatenate((to_indices, sources))
+    graph = sparse.csr_matrix((np.ones(len(rows)), (rows, columns)), shape=(n + 1, n + 1))
+
+    order = csgraph.breadth_first_order(graph, n, return_predecessors=False)
+    reachable = np.zeros(n + 1, dtype=bool)
+    reachable[order] = True
+    return reachable[:n]
+
+
+def _get_class_periods(labels, n_classes, from_indices, to_indices):
+    """
+        Return the period of each class, given the edges within classes.
+        A breadth-first search from one node of each class gives each node a level.
+        The period of a class is the gcd of level[u] + 1 - level[v] over its edges u -> v.
+    """
+
+    n = len(labels)
+    graph = sparse.csr_matrix((np.ones(len(from_indices)), (from_indices, to_indices)), shape=(n, n))
+    indptr = graph.indptr.tolist()
+    indices = graph.indices.tolist()
+
+    # Search from the first node in every class at once, since edges don't leave classes
+    _, roots = np.unique(labels, return_index=True)
+    levels = [-1] * n
+    for root in roots.tolist():
+        levels[root] = 0
+
+    queue = roots.tolist()
+    for node in queue:
+        next_level = levels[node] + 1
+        for child in indices[indptr[node]:indptr[node + 1]]:
+            if levels[child] == -1:
+                levels[child] = next_level
+                queue.append(child)
+
+    levels = np.array(levels)
+    differences = np.abs(levels[from_indices] + 1 - levels[to_indices])
+
+    # gcd of the differences for each class, with 0 for classes without edges
+    periods = np.zeros(n_classes, dtype=int)
+    edge_labels = labels[from_indices]
+    order = np.argsort(edge_labels, kind='stable')
+    edge_labels = edge_labels[order]
+    differences = differences[order]
+
+    if len(edge_labels):
+        starts = np.flatnonzero(np.r_[True, edge_labels[1:] != edge_labels[:-1]])
+        periods[edge_labels[starts]] = np.gcd.reduceat(differences, starts)
+
+    return periods
+
 
 class Node:
     """A node in a Markov chain."""
@@ -0,0 +1,201 @@
+import hashlib
+import os
+import numpy as np
+
+# Layout of each edge in an edge file
+EDGE_DTYPE = np.dtype([('from', np.int64), ('to', np.int64), ('probability', np.float64)])
+
+# Blocks whose edges go to a wider range of states than this times their size are sorted rather than counted
+_MAX_RANGE_PER_EDGE = 4
+
+
+def write_edge_file(edges, filename, block_size=1000000):
+    """
+        Write edges to a binary file which can be memory-mapped for power iteration.
+        Edges can be a MarkovChain or an iterable of (from index, to index, probability)
+        tuples, such as a generator reading a chain too large to hold in memory.
+        Edges are written in blocks of block_size, so only one block is held in memory.
+    """
+
+    if hasattr(edges, 'edges'):
+        edges = (
+            (edge.from_node.index, edge.to_node.index, edge.probability)
+            for edge in edges.edges
+        )
+
+    with open(filename, 'wb') as f:
+        block = []
+        for edge in edges:
+            block.append(edge)
+            if len(block) == block_size:
+                np.array(block, dtype=EDGE_DTYPE).tofile(f)
+                block = []
+
+        if block:
+            np.array(block, dtype=EDGE_DTYPE).tofile(f)
+
+
+def read_edge_file(filename):
+    """ Return a read-only memory-mapped array of the edges in an edge file. """
+    if os.path.getsize(filename) == 0:
+        return np.zeros(0, dtype=EDGE_DTYPE)
+    return np.memmap(filename, dtype=EDGE_DTYPE, mode='r')
+
+
+def iterate_blocks(edges, block_size):
+    """ Yield consecutive blocks of at most block_size edges. """
+    for start in range(0, len(edges), block_size):
+        yield edges[start:start + block_size]
+
+
+def power_iteration(
+    filename,
+    n_states=None,
+    start=None,
+    steps=None,
+    lazy=False,
+    tolerance=1e-12,
+    max_iterations=100000,
+    block_size=1000000,
+    checkpoint=None,
+    checkpoint_interval=10,
+    dtype=float,
+):
+    """
+        Multiply a distribution by the transition matrix stored in an edge file, streaming
+        the edges from disk in blocks, so only O(n_states) values are held in memory.
+
+        If steps is given, return the distribution after that many steps from start, which
+        can be a node index or a distribution. Otherwise, iterate until the distribution
+        changes by less than tolerance, giving the stationary distribution. The default
+        start is the uniform distribution. Set lazy to True to iterate the lazy chain,
+        (I + P) / 2, which has the same stationary distribution but converges for
+        periodic chains.
+
+        Nodes with no outgoing edges are treated as absorbing.
+        The distribution is stored and accumulated with the given dtype. Each block takes
+        time proportional to its size, rather than n_states, and iteration is fastest
+        when the edge file is sorted by the states edges go to.
+
+        If checkpoint is a filename, the distribution is saved there every checkpoint_interval
+        iterations, and an existing checkpoint is loaded so an interrupted run can resume.
+        The checkpoint records the number of states, start, steps, lazy and the edge file's
+        size and modification time, and a ValueError is raised if these don't match the run.
+    """
+
+    edges = read_edge_file(filename)
+
+    # One pass to find the number of states and which states are absorbing
+    if n_states is None:
+        n_states = 0
+        for block in iterate_blocks(edges, block_size):
+            n_states = max(n_states, int(block['from'].max()) + 1, int(block['to'].max()) + 1)
+
+    if n_states == 0:
+        raise ValueError('Edge file {0} is empty, so n_states must be given'.format(filename))
+
+    has_edges = np.zeros(n_states, dtype=bool)
+    for block in iterate_blocks(edges, block_size):
+        has_edges[block['from']] = True
+    absorbing = ~has_edges
+
+    iteration = 0
+    parameters = _get_checkpoint_parameters(filename, n_states, start, steps, lazy)
+    if checkpoint is not None and os.path.exists(checkpoint):
+        distribution, iteration = load_checkpoint(checkpoint, parameters)
+        distribution = distribution.astype(dtype)
+        if steps is not None and iteration > steps:
+            raise ValueError('Checkpoint {0} is at iteration {1}, past {2} steps'.format(checkpoint, iteration, steps))
+    elif start is None:
+        distribution = np.full(n_states, 1 / n_states, dtype=dtype)
+    elif np.ndim(start) == 0:
+        distribution = np.zeros(n_states, dtype=dtype)
+        distribution[start] = 1
+    else:
+        distribution = np.array(start, dtype=dtype)
+
+    n_iterations = steps if steps is not None else max_iterations
+
+    while iteration < n_iterations:
+        next_distribution = np.where(absorbing, distribution, 0)
+        for block in iterate_blocks(edges, block_size):
+            weights = distribution[block['from']] * block['probability'].astype(dtype)
+            if next_distribution.dtype.itemsize <= 8:
+                # Only sum over the states the block's edges go to, so small blocks of a large chain stay cheap
+                to_indices = block['to']
+                lo = int(to_indices.min())
+                hi = int(to_indices.max())
+                if hi - lo < _MAX_RANGE_PER_EDGE * len(block):
+                    next_distribution[lo:hi + 1] += np.bincount(to_indices - lo, weights=weights, minlength=hi - lo + 1)
+                else:
+                    states, inverse = np.unique(to_indices, return_inverse=True)
+                    next_distribution[states] += np.bincount(inverse, weights=weights)
+            else:
+                # bincount sums in float64, so sum wider types without it
+                np.add.at(next_distribution, block['to'], weights)
+
+        if lazy:
+            next_distribution = (next_distribution + distribution) / 2
+
+        change = np.abs(next_distribution - distribution).sum()
+        distribution = next_distribution
+        iteration += 1
+
+        if checkpoint is not None and iteration % checkpoint_interval == 0:
+            save_checkpoint(checkpoint, distribution, iteration, parameters)
+
+        if steps is None and change < tolerance:
+            break
+
+    if checkpoint is not None:
+        save_checkpoint(checkpoint, distribution, iteration, parameters)
+
+    return distribution
+
+
+def save_checkpoint(filename, distribution, iteration, parameters=None):
+    """
+        Save a distribution and iteration count, with a dictionary of the parameters
+        of the run, replacing any existing checkpoint atomically.
+    """
+
+    temporary_filename = filename + '.tmp'
+    with open(temporary_filename, 'wb') as f:
+        np.savez(f, distribution=distribution, iteration=iteration, **{
+            'parameter_' + key: value for key, value in (parameters or {}).items()
+        })
+    os.replace(temporary_filename, filename)
+
+
+def load_checkpoint(filename, parameters=None):
+    """
+        Return the distribution and iteration count saved in a checkpoint, raising a
+        ValueError if it was saved with different parameters.
+    """
+
+    with np.load(filename) as saved:
+        for key, value in (parameters or {}).items():
+            saved_key = 'parameter_' + key
+            if saved_key not in saved or saved[saved_key].item() != value:
+                raise ValueError('Checkpoint {0} was saved with a different {1}'.format(filename, key))
+        return saved['distribution'], int(saved['iteration'])
+
+
+def _get_checkpoint_parameters(filename, n_states, start, steps, lazy):
+    # Values which must match for a checkpoint to be resumed
+    if start is None:
+        start_key = 'uniform'
+    elif np.ndim(start) == 0:
+        start_key = 'node {0}'.format(int(start))
+    else:
+        start_key = hashlib.sha1(np.ascontiguousarray(start, dtype=np.float64).tobytes()).hexdigest()
+
+    stat = os.stat(filename)
+    return {
+        'n_states': n_states,
+        'start': start_key,
+        'steps': -1 if steps is None else steps,
+        'lazy': bool(lazy),
+        'edge_file_size': stat.st_size,
+        'edge_file_mtime': stat.st_mtime_ns,
+    }
@@ -0,0 +1,116 @@
+"""
+    Asyncio front-end for running chain analysis without blocking the event loop.
+
+    For example, in a request handler:
+        service = AnalysisService(max_workers=4)
+        steps = await service.run(chain, 'get_expected_steps_before_absorption')
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from errors import ServiceBusyError
+
+
+class AnalysisService:
+    """
+        Runs MarkovChain methods in a bounded executor.
+
+        Concurrent requests for the same method and arguments on the same version of
+        a chain share one calculation, and so receive the same result object, which
+        should not be modified. At most max_running calculations run at once; further
+        requests wait, unless max_waiting requests are already waiting, in which case
+        a ServiceBusyError is raised so the caller can shed load.
+    """
+
+    def __init__(self, max_workers=4, max_running=None, max_waiting=None, executor=None):
+        self.max_running = max_running if max_running is not None else max_workers
+        self.max_waiting = max_waiting
+
+        self._owns_executor = executor is None
+        self._executor = executor if executor is not None else ThreadPoolExecutor(max_workers)
+
+        # Map request keys to the futures of calculations in progress
+        self._in_progress = {}
+        self._semaphore = None
+        self._waiting = 0
+
+    async def run(self, chain, method, *args, **kwargs):
+        """ Return the result of chain.method(*args, **kwargs), calculated in the executor. """
+        key = _get_request_key(chain, method, args, kwargs)
+
+        future = self._in_progress.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        if self.max_waiting is not None and self._semaphore is not None and self._semaphore.locked():
+            if self._waiting >= self.max_waiting:
+                raise ServiceBusyError('{0} requests are already waiting'.format(self._waiting))
+
+        # Created here so it belongs to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_running)
+
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+
+        # An identical request may have started while this one was waiting, in which
+        # case share it without holding a place that another calculation could use
+        future = self._in_progress.get(key)
+        if future is not None:
+            self._semaphore.release()
+            return await asyncio.shield(future)
+
+        try:
+            loop = asyncio.get_running_loop()
+            call = functools.partial(getattr(chain, method), *args, **kwargs)
+            future = loop.run_in_executor(self._executor, call)
+
+            if key is not None:
+                self._in_progress[key] = future
+                future.add_done_callback(lambda _: self._in_progress.pop(key, None))
+
+            return await asyncio.shield(future)
+        finally:
+            self._semaphore.release()
+
+    @property
+    def in_progress(self):
+        """ Number of distinct calculations currently running. """
+        return len(self._in_progress)
+
+    def close(self):
+        """ Shut down the executor if the service created it. """
+        if self._owns_executor:
+            self._executor.shutdown(wait=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        self.close()
+
+
+def _get_request_key(chain, method, args, kwargs):
+    # Requests with the same key give the same result, or None if arguments can't be compared
+    key = (id(chain), chain.version, method, _freeze(args), _freeze(kwargs))
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def _freeze(value):
+    # Convert lists, sets and dicts to hashable equivalents
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    return value
@@ -1,5 +1,7 @@
 from collections import defaultdict
 
+from instrumentation import phase
+
 
 class SVGElement:
     """ Generic element with attributes and potential child elements.
@@ -115,10 +117,11 @@ class SVG(SVGElement):
     def write(self, filename=None):
         """ Write output to file if given a filename, otherwise return output as a string. """
 
-        if not filename:
-            return self.output()
-        else:
-            self.write_to_file(filename)
+        with phase('svg.write', elements=len(self.children)):
+            if not filename:
+                return self.output()
+            else:
+                self.write_to_file(filename)
 
 
 class SVGStyleElement(SVGElement):
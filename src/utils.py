@@ -1,14 +1,202 @@
+import sys
+import numpy as np
 from fractions import Fraction
 
 
-def write_matrix_with_fractions(matrix):
-    # Get 2D list of strings showing fractions
-    strings = list()
-    for row in matrix:
-        strings.append([str(Fraction(value).limit_denominator()) for value in row])
+# Largest fractional part * max_denominator ** 2 for which approximate_fractions uses floats
+_MAX_FLOAT_PRECISION = 2.0 ** 44
+
+
+def approximate_fractions(values, max_denominator=1000000):
+    """
+        Find the closest fraction with a denominator at most max_denominator
+        to every value in an array, like Fraction.limit_denominator, but using
+        continued fractions evaluated over the whole array at once.
+        Returns a tuple of integer arrays (numerators, denominators).
+        Values which are not finite are given a denominator of 0.
+
+        Shifting a value by an integer doesn't change its closest fractions, so
+        only the fractional part, which floats hold exactly, is approximated.
+        Values which need more precision than floats have, because their numerator
+        is at least 2 ** 53 or max_denominator is very large, are found with
+        Fraction.limit_denominator instead. If any numerator doesn't fit in int64,
+        the arrays have dtype object.
+    """
+
+    values = np.asarray(values, dtype=float)
+    shape = values.shape
+    values = values.ravel()
+    finite = np.isfinite(values)
+    magnitudes = np.where(finite, np.abs(values), 0.0)
+    whole = np.floor(magnitudes)
+    x = magnitudes - whole
+
+    # Convergents p1 / q1 and the previous convergents p0 / q0
+    p0 = np.zeros_like(x)
+    q0 = np.ones_like(x)
+    p1 = np.ones_like(x)
+    q1 = np.zeros_like(x)
+
+    remainder = x.copy()
+    active = np.ones(x.shape, dtype=bool)
+    hit_limit = np.zeros(x.shape, dtype=bool)
+
+    # Doubles have 53 bits, so the expansion terminates well within 64 terms
+    for _ in range(64):
+        if not active.any():
+            break
+
+        a = np.floor(remainder)
+        q2 = q0 + a * q1
+
+        limited = active & (q2 > max_denominator)
+        hit_limit |= limited
+        step = active & ~limited
+
+        p2 = p0 + a * p1
+        p0 = np.where(step, p1, p0)
+        q0 = np.where(step, q1, q0)
+        p1 = np.where(step, p2, p1)
+        q1 = np.where(step, q2, q1)
+
+        # Stop when the remainder is (numerically) zero, otherwise invert it
+        fractional = remainder - a
+        done = fractional <= 1e-12 * np.maximum(remainder, 1)
+        active = step & ~done
+        np.divide(1, fractional, out=remainder, where=active)
+
+    # Where the denominator limit was hit, the best approximation is either
+    # the last convergent or the largest semiconvergent within the limit, and
+    # like limit_denominator, the convergent if they are equally close
+    k = np.floor((max_denominator - q0) / np.where(hit_limit, q1, 1))
+    p_semi = p0 + k * p1
+    q_semi = q0 + k * q1
+    semi_distance = np.abs(p_semi / q_semi - x)
+    distance = np.abs(p1 / np.where(q1, q1, 1) - x)
+    use_semi = hit_limit & (semi_distance < distance)
+
+    # Compare distances which are too close for floats exactly
+    ties = np.flatnonzero(hit_limit & (np.abs(semi_distance - distance) <= 1e-12 * (x + semi_distance + distance)))
+    for i in ties:
+        exact_x = Fraction(x[i])
+        use_semi[i] = (
+            abs(Fraction(int(p_semi[i]), int(q_semi[i])) - exact_x) < abs(Fraction(int(p1[i]), int(q1[i])) - exact_x)
+        )
+
+    numerators = np.where(use_semi, p_semi, p1)
+    denominators = np.where(use_semi, q_semi, q1)
+
+    numerators = numerators + whole * denominators
+
+    # Use exact arithmetic where the floating point result may not be the closest
+    exact = finite & (
+        (x * float(max_denominator) ** 2 >= _MAX_FLOAT_PRECISION)
+        | (magnitudes * max_denominator >= 2.0 ** 53)
+    )
+    numerators = np.where(finite & ~exact, np.copysign(numerators, values), 0).astype(np.int64)
+    denominators = np.where(finite & ~exact, denominators, 0).astype(np.int64)
+
+    if exact.any():
+        fractions = [Fraction(value).limit_denominator(max_denominator) for value in values[exact].tolist()]
+        exact_numerators = [fraction.numerator for fraction in fractions]
+        if max(abs(numerator) for numerator in exact_numerators) > np.iinfo(np.int64).max:
+            numerators = numerators.astype(object)
+        numerators[exact] = exact_numerators
+        denominators[exact] = [fraction.denominator for fraction in fractions]
+
+    return numerators.reshape(shape), denominators.reshape(shape)
+
+
+def format_fractions(values, max_denominator=1000000):
+    """
+        Return an array of strings showing each value as a fraction,
+        e.g. '3/7', or as an integer if the denominator is 1.
+    """
+
+    values = np.asarray(values)
+
+    # Fractions from exact calculations are already as precise as possible
+    if values.dtype == object:
+        return np.array([
+            str(value if isinstance(value, Fraction) else Fraction(value).limit_denominator(max_denominator))
+            for value in values.ravel()
+        ], dtype=str).reshape(values.shape)
+
+    numerators, denominators = approximate_fractions(values, max_denominator)
+
+    # String operations are much faster on narrow fixed-width strings
+    integers = numerators.astype(_string_dtype(numerators))
+    fractions = np.char.add(
+        np.char.add(integers, '/'),
+        denominators.astype(_string_dtype(denominators))
+    )
+    strings = np.where(denominators > 1, fractions, integers)
+
+    # Values such as inf and nan have no fractional representation
+    not_finite = denominators == 0
+    if not_finite.any():
+        strings = strings.astype(object)
+        strings[not_finite] = values[not_finite].astype(str)
+        strings = strings.astype(str)
+
+    return strings
+
+
+def _string_dtype(integers):
+    # Narrowest string type which can hold every integer in the array
+    largest = int(np.abs(integers).max()) if integers.size else 0
+    return 'U{}'.format(len(str(largest)) + 1)
+
+
+def write_matrix_with_fractions(matrix, stream=None, max_denominator=1000000, nonzero_only=False, chunk_rows=256):
+    """
+        Write a matrix to a stream (default stdout) with values as fractions.
+        If nonzero_only is True, only non-zero entries are written, one per line,
+        as 'row  column  value'. This also accepts scipy sparse matrices.
+        Output is written in chunks of chunk_rows rows.
+    """
+
+    if stream is None:
+        stream = sys.stdout
+
+    if nonzero_only:
+        _write_nonzero_fractions(matrix, stream, max_denominator, chunk_rows)
+        return
+
+    strings = format_fractions(matrix, max_denominator)
+    if strings.ndim < 2:
+        strings = strings.reshape(-1, 1)
+    if strings.size == 0:
+        return
 
     # Pad with two more spaces than the longest string
-    padding = max(len(value) for row in strings for value in row)
+    padding = np.char.str_len(strings).max()
+    strings = np.char.ljust(strings, padding)
+
+    for start in range(0, strings.shape[0], chunk_rows):
+        rows = strings[start:start + chunk_rows]
+        stream.write("\n".join("  ".join(row) for row in rows.tolist()) + "\n")
+
+
+def _write_nonzero_fractions(matrix, stream, max_denominator, chunk_rows):
+    if hasattr(matrix, 'tocoo'):
+        coo = matrix.tocoo()
+        rows, columns, values = coo.row, coo.col, coo.data
+    else:
+        matrix = np.asarray(matrix)
+        if matrix.ndim < 2:
+            matrix = matrix.reshape(-1, 1)
+        rows, columns = np.nonzero(matrix)
+        values = matrix[rows, columns]
+
+    order = np.lexsort((columns, rows))
+    rows, columns, values = rows[order], columns[order], values[order]
+    strings = format_fractions(values, max_denominator)
 
-    for row in strings:
-        print("  ".join("{value: <{padding}}".format(value=value, padding=padding) for value in row))
\ No newline at end of file
+    # Write about as many entries per chunk as a dense write would
+    chunk_size = max(1, chunk_rows * 64)
+    for start in range(0, len(strings), chunk_size):
+        end = start + chunk_size
+        lines = np.char.add(np.char.add(rows[start:end].astype(str), '  '), columns[start:end].astype(str))
+        lines = np.char.add(np.char.add(lines, '  '), strings[start:end])
+        stream.write("\n".join(lines.tolist()) + "\n")
@@ -0,0 +1,75 @@
+import unittest
+
+import numpy as np
+
+from src.bootstrap import bootstrap_expected_steps
+
+# A: 1 step to absorb 1/2 the time, else back to A
+COUNTS = [
+    [50, 50],
+    [0, 0],
+]
+
+# Corridor A -> B -> C, with B sometimes returning to A
+CORRIDOR_COUNTS = [
+    [0, 40, 0],
+    [10, 0, 30],
+    [0, 0, 0],
+]
+
+
+class TestBootstrap(unittest.TestCase):
+    def test_expected_steps(self):
+        result = bootstrap_expected_steps(COUNTS, n_resamples=200, seed=0)
+        np.testing.assert_array_equal(result['transient'], [0])
+        np.testing.assert_allclose(result['expected_steps'], [2])
+
+        lower, upper = result['percentiles']
+        self.assertLess(lower[0], 2)
+        self.assertGreater(upper[0], 2)
+        self.assertEqual(result['failures'], 0)
+
+    def test_methods(self):
+        for method in ('dirichlet', 'multinomial'):
+            result = bootstrap_expected_steps(
+                CORRIDOR_COUNTS, n_resamples=500, method=method, percentiles=(2.5, 50, 97.5), seed=1
+            )
+            np.testing.assert_allclose(result['expected_steps'], [8 / 3, 5 / 3])
+
+            lower, median, upper = result['percentiles']
+            self.assertTrue((lower < median).all())
+            self.assertTrue((median < upper).all())
+            np.testing.assert_allclose(median, result['expected_steps'], rtol=0.1)
+
+    def test_reproducible(self):
+        first = bootstrap_expected_steps(CORRIDOR_COUNTS, n_resamples=100, batch_size=30, seed=2)
+        second = bootstrap_expected_steps(CORRIDOR_COUNTS, n_resamples=100, batch_size=30, seed=2, processes=2)
+        np.testing.assert_array_equal(first['percentiles'], second['percentiles'])
+
+    def test_prior(self):
+        # A positive prior allows transitions from A to itself
+        result = bootstrap_expected_steps([[0, 5], [0, 0]], n_resamples=100, prior=1, seed=3)
+        lower, upper = result['percentiles']
+        self.assertEqual(lower[0] < upper[0], True)
+
+        result = bootstrap_expected_steps([[0, 5], [0, 0]], n_resamples=100, seed=3)
+        np.testing.assert_allclose(result['percentiles'], [[1], [1]])
+
+    def test_singular_resamples(self):
+        # Resampling may lose B's only transition out
+        counts = [
+            [0, 1, 0],
+            [1, 0, 1],
+            [0, 0, 0],
+        ]
+        result = bootstrap_expected_steps(counts, n_resamples=200, method='multinomial', seed=4)
+        self.assertGreater(result['failures'], 0)
+        self.assertTrue(np.isfinite(result['percentiles']).all())
+
+    def test_invalid_counts(self):
+        with self.assertRaises(ValueError):
+            bootstrap_expected_steps([[1, 0], [0, 1]])
+        with self.assertRaises(ValueError):
+            bootstrap_expected_steps([[1, -1], [0, 0]])
+        with self.assertRaises(ValueError):
+            bootstrap_expected_steps(COUNTS, method='jackknife')
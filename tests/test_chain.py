@@ -1,6 +1,14 @@
+import tracemalloc
 import unittest
+from decimal import Decimal
+from fractions import Fraction
 
-from src.markov_chain import MarkovChain
+import numpy as np
+
+from src.generators import grid_walk
+from src.markov_chain import MarkovChain, Edge
+from src.markov_chain import MarkovChainPropertyError, InvalidProbabilitiesError, DuplicateEdgeError
+from src.markov_chain import PrecisionWarning
 
 
 class TestMarkovChain(unittest.TestCase):
@@ -42,13 +50,64 @@ class TestMarkovChain(unittest.TestCase):
         chain = MarkovChain(3)
         chain.add_edge(0, 1)
         chain.add_edge(1, 2, 0.7)
-        chain.add_edge(1, 2, 0.25)
+        chain.add_edge(1, 0, 0.25)
 
         self.assertEqual(len(chain.nodes), 3)
         self.assertEqual(len(chain.edges), 3)
         self.assertEqual(len(chain.nodes[1].edges_out), 2)
         self.assertEqual(chain.nodes[1].edges_out[1].probability, 0.25)
 
+    def test_add_duplicate_edge(self):
+        chain = MarkovChain(3)
+        chain.add_edge(1, 2, 0.5)
+        chain.add_edge(1, 2, 0.25)
+
+        self.assertEqual(len(chain.edges), 1)
+        self.assertEqual(len(chain.nodes[1].edges_out), 1)
+        self.assertEqual(len(chain.nodes[2].edges_in), 1)
+        self.assertEqual(chain.edges[0].probability, 0.75)
+
+    def test_replace_duplicate_edge(self):
+        chain = MarkovChain(3, duplicates='replace')
+        chain.add_edge(1, 2, 0.5)
+        chain.add_edge(1, 2, 0.25)
+
+        self.assertEqual(len(chain.edges), 1)
+        self.assertEqual(chain.edges[0].probability, 0.25)
+
+    def test_error_on_duplicate_edge(self):
+        chain = MarkovChain(3, duplicates='error')
+        chain.add_edge(1, 2, 0.5)
+
+        with self.assertRaises(DuplicateEdgeError):
+            chain.add_edge(1, 2, 0.25)
+
+    def test_get_edge(self):
+        chain = MarkovChain(3)
+        edge = chain.add_edge(0, 1, 0.5)
+
+        self.assertTrue(chain.has_edge(0, 1))
+        self.assertFalse(chain.has_edge(1, 0))
+        self.assertIs(chain.get_edge(0, 1), edge)
+        self.assertIsNone(chain.get_edge(1, 0))
+
+    def test_coalesce_edges(self):
+        chain = MarkovChain(2)
+        chain.add_edge(0, 1, 0.5)
+
+        # Add a duplicate edge without going through add_edge
+        edge = Edge(chain.nodes[0], chain.nodes[1], 0.25)
+        chain.edges.append(edge)
+        chain.nodes[0].edges_out.append(edge)
+        chain.nodes[1].edges_in.append(edge)
+
+        chain.coalesce_edges()
+
+        self.assertEqual(len(chain.edges), 1)
+        self.assertEqual(len(chain.nodes[0].edges_out), 1)
+        self.assertEqual(len(chain.nodes[1].edges_in), 1)
+        self.assertEqual(chain.get_edge(0, 1).probability, 0.75)
+
     def test_add_edges(self):
         chain = MarkovChain(3)
         chain.add_edges(((0, 1), (1, 2, 0.75), (1, 0, 0.25)))
@@ -93,3 +152,284 @@ class TestMarkovChainAbsorption(unittest.TestCase):
     def test_all_nodes_in(self):
         chain = MarkovChain(((1, 0), (2, 0), (3, 0)))
         self.assertEqual(chain.is_absorbing(), True)
+
+
+class TestMarkovChainExpectedSteps(unittest.TestCase):
+    def setUp(self):
+        self.chain = MarkovChain(edges=(
+            (0, 1, Fraction(1, 3)),
+            (1, 0, Fraction(4, 5)),
+            (1, 2, Fraction(1, 5)),
+            (0, 3, Fraction(2, 3)),
+            (3, 0, Fraction(2, 5)),
+            (3, 4, Fraction(3, 5)),
+        ))
+
+    def test_expected_steps(self):
+        N = self.chain.get_expected_steps()
+        self.assertAlmostEqual(N[0, 0], 15 / 7)
+        self.assertAlmostEqual(N[1, 2], 8 / 7)
+
+    def test_exact_expected_steps(self):
+        N = self.chain.get_expected_steps(exact=True)
+        self.assertEqual(N[0, 0], Fraction(15, 7))
+        self.assertEqual(N[1, 2], Fraction(8, 7))
+        self.assertEqual(N[2, 1], Fraction(2, 7))
+
+    def test_exact_expected_steps_before_absorption(self):
+        steps = self.chain.get_expected_steps_before_absorption(exact=True)
+        self.assertEqual(list(steps[:, 0]), [Fraction(30, 7), Fraction(31, 7), Fraction(19, 7)])
+
+    def test_expected_steps_dtype(self):
+        for dtype in (np.float32, np.float64, np.longdouble):
+            N = self.chain.get_expected_steps(dtype=dtype)
+            self.assertEqual(N.dtype, dtype)
+            self.assertAlmostEqual(float(N[0, 0]), 15 / 7, places=5)
+
+    def test_expected_steps_residual(self):
+        with self.assertWarns(PrecisionWarning):
+            self.chain.get_expected_steps(dtype=np.float32, max_residual=1e-12)
+
+    def test_return_residual(self):
+        N, residual = self.chain.get_expected_steps(return_residual=True)
+        self.assertAlmostEqual(float(N[0, 0]), 15 / 7)
+        self.assertLess(residual, 1e-12)
+
+        _, float32_residual = self.chain.get_expected_steps(dtype=np.float32, return_residual=True)
+        self.assertGreater(float32_residual, residual)
+
+        steps, residual = self.chain.get_expected_steps_before_absorption(exact=True, return_residual=True)
+        self.assertEqual(steps[0, 0], Fraction(30, 7))
+        self.assertEqual(residual, 0)
+
+    def test_exact_steps_from_float_probabilities(self):
+        chain = MarkovChain(edges=((0, 0, 0.9), (0, 1, 0.1)))
+        N = chain.get_expected_steps(exact=True)
+        self.assertEqual(N[0, 0], 10)
+
+    def test_exact_steps_from_decimal_probabilities(self):
+        # Decimals with more digits than a float holds are converted exactly
+        probability = Decimal('0.10000000000000000000001')
+        chain = MarkovChain(edges=((0, 0, 1 - probability), (0, 1, probability)))
+        N = chain.get_expected_steps(exact=True)
+        self.assertEqual(N[0, 0], 1 / Fraction(probability))
+
+
+class TestMarkovChainHittingTimes(unittest.TestCase):
+    def test_hitting_times(self):
+        chain = MarkovChain(edges=((0, 1), (1, 0, 0.5), (1, 2, 0.5), (2, 2)))
+        hitting_times = chain.get_hitting_times([2])
+        self.assertEqual(list(hitting_times), [4, 3, 0])
+
+    def test_target_may_not_be_reached(self):
+        chain = MarkovChain(edges=((0, 1), (1, 0, 0.5), (1, 2, 0.5), (2, 2)))
+        hitting_times = chain.get_hitting_times([0])
+        self.assertEqual(list(hitting_times), [0, float('inf'), float('inf')])
+
+    def test_multiple_targets(self):
+        chain = MarkovChain(edges=((0, 1, 0.5), (0, 2, 0.5), (1, 1, 0.5), (1, 3, 0.5)))
+        hitting_times = chain.get_hitting_times([2, 3])
+        self.assertEqual(list(hitting_times), [2, 2, 0, 0])
+
+    def test_zero_probability_edges(self):
+        chain = MarkovChain(edges=((0, 1, 1), (0, 2, 0), (1, 0, 0.5), (1, 3, 0.5), (2, 2)))
+        hitting_times = chain.get_hitting_times([3])
+        self.assertEqual(list(hitting_times), [4, 3, float('inf'), 0])
+
+        chain = MarkovChain(edges=((0, 0, 1), (0, 1, 0)))
+        hitting_times = chain.get_hitting_times([1])
+        self.assertEqual(list(hitting_times), [float('inf'), 0])
+
+    def test_mean_first_passage_times(self):
+        chain = MarkovChain(edges=((0, 1), (1, 0, 0.5), (1, 1, 0.5)))
+        M = chain.get_mean_first_passage_times()
+        self.assertEqual(M.tolist(), [[0, 1], [2, 0]])
+
+
+class TestMarkovChainValidation(unittest.TestCase):
+    def test_valid_chain(self):
+        chain = MarkovChain(edges=((0, 1, 0.25), (0, 2, 0.75), (1, 2)))
+        chain.validate()
+
+    def test_invalid_chain(self):
+        chain = MarkovChain(edges=((0, 1, 0.25), (0, 2, 0.5), (1, 2, 1.5), (2, 0, -0.5), (2, 1, 1.5)))
+
+        with self.assertRaises(InvalidProbabilitiesError) as context:
+            chain.validate()
+        self.assertEqual(context.exception.nodes, [0, 1, 2])
+
+    def test_normalise(self):
+        chain = MarkovChain(edges=((0, 1, 1), (0, 2, 3), (1, 2, 0.5)))
+        chain.normalise()
+
+        self.assertEqual([edge.probability for edge in chain.edges], [0.25, 0.75, 1])
+        chain.validate()
+
+
+class TestMarkovChainClassification(unittest.TestCase):
+    def test_periodic_chain(self):
+        chain = MarkovChain(edges=((0, 1), (1, 2), (2, 3), (3, 0)))
+        classification = chain.classify()
+
+        self.assertEqual(list(classification['periods']), [4])
+        self.assertTrue(classification['irreducible'])
+        self.assertFalse(classification['aperiodic'])
+        self.assertFalse(classification['ergodic'])
+
+    def test_ergodic_chain(self):
+        chain = MarkovChain(edges=((0, 1), (1, 2), (2, 3), (3, 0, 0.5), (3, 1, 0.5)))
+        classification = chain.classify()
+
+        self.assertEqual(list(classification['periods']), [1])
+        self.assertTrue(classification['ergodic'])
+
+    def test_reducible_chain(self):
+        chain = MarkovChain(edges=((0, 1, 0.5), (0, 2, 0.5), (1, 0), (2, 3), (3, 2)))
+        classification = chain.classify()
+        labels = classification['labels']
+
+        self.assertEqual(labels[0], labels[1])
+        self.assertEqual(labels[2], labels[3])
+        self.assertFalse(classification['irreducible'])
+        self.assertEqual(list(classification['recurrent'][labels[[0, 2]]]), [False, True])
+        self.assertEqual(list(classification['periods'][labels[[0, 2]]]), [2, 2])
+
+    def test_absorbing_chain(self):
+        chain = MarkovChain(edges=((0, 1), (1, 2)))
+        classification = chain.classify()
+        labels = classification['labels']
+
+        self.assertTrue(classification['absorbing'])
+        self.assertTrue(classification['aperiodic'])
+        self.assertEqual(list(classification['periods'][labels]), [0, 0, 1])
+
+
+class TestMarkovChainMixing(unittest.TestCase):
+    def setUp(self):
+        self.chain = MarkovChain(edges=(
+            (0, 0, 0.5), (0, 1, 0.5),
+            (1, 0, 0.25), (1, 1, 0.25), (1, 2, 0.5),
+            (2, 1, 0.5), (2, 2, 0.5),
+        ))
+
+    def test_n_step_distribution(self):
+        distribution = self.chain.get_n_step_distribution(0, 2)
+        self.assertEqual(list(distribution), [0.375, 0.375, 0.25])
+
+    def test_stationary_distribution(self):
+        distribution = self.chain.get_stationary_distribution()
+        np.testing.assert_allclose(distribution, [0.2, 0.4, 0.4])
+
+    def test_periodic_stationary_distribution(self):
+        chain = MarkovChain(edges=((0, 1), (1, 0, 0.5), (1, 2, 0.5), (2, 1)))
+        distribution = chain.get_stationary_distribution()
+        np.testing.assert_allclose(distribution, [0.25, 0.5, 0.25])
+
+    def test_spectral_gap(self):
+        self.assertTrue(self.chain.is_reversible())
+        spectral_gap = self.chain.get_spectral_gap()
+        self.assertAlmostEqual(spectral_gap['slem'], 0.5)
+        self.assertAlmostEqual(spectral_gap['relaxation_time'], 2)
+
+    def test_sparse_spectral_gap(self):
+        n = 20
+        chain = MarkovChain(edges=[(i, (i + 1) % n, 0.7) for i in range(n)] + [(i, i, 0.3) for i in range(n)])
+        expected = np.sort(np.abs(np.linalg.eigvals(chain.get_transition_matrix())))[-2]
+
+        self.assertFalse(chain.is_reversible())
+        self.assertAlmostEqual(chain.get_spectral_gap()['slem'], expected)
+
+    def test_spectral_gap_budget(self):
+        n = 200
+        chain = MarkovChain(edges=[(i, (i + 1) % n, 0.7) for i in range(n)] + [(i, i, 0.3) for i in range(n)])
+
+        spectral_gap = chain.get_spectral_gap(max_iterations=2)
+        self.assertFalse(spectral_gap['converged'])
+
+        # With reversible given, no stationary distribution is needed, so the time limit has nothing to stop
+        n = 20
+        chain = MarkovChain(edges=[(i, (i + 1) % n, 0.7) for i in range(n)] + [(i, i, 0.3) for i in range(n)])
+        spectral_gap = chain.get_spectral_gap(reversible=False, time_limit=0)
+        self.assertTrue(spectral_gap['converged'])
+        self.assertAlmostEqual(spectral_gap['slem'], abs(0.3 + 0.7 * np.exp(2j * np.pi / n)))
+
+    def test_stationary_distribution_time_limit(self):
+        distribution = self.chain.get_stationary_distribution(time_limit=0)
+        self.assertAlmostEqual(distribution.sum(), 1)
+
+    def test_mixing_time(self):
+        mixing_time = self.chain.get_mixing_time(epsilon=0.25)
+        self.assertEqual(mixing_time['mixing_time'], 2)
+
+    def test_mixing_time_budget(self):
+        mixing_time = self.chain.get_mixing_time(epsilon=1e-12, max_steps=3)
+        self.assertIsNone(mixing_time['mixing_time'])
+        self.assertEqual(mixing_time['steps'], 3)
+
+    def test_mixing_time_batches(self):
+        chain = MarkovChain(edges=[(i, (i + 1) % 10, 0.5) for i in range(10)] + [(i, i, 0.5) for i in range(10)])
+        expected = chain.get_mixing_time(batch_size=10)
+        for batch_size in (1, 3):
+            self.assertEqual(chain.get_mixing_time(batch_size=batch_size), expected)
+
+    def test_mixing_time_memory(self):
+        chain = grid_walk(50, 50, stay=0.5)
+        n = len(chain.nodes)
+        # Import the solvers before tracing
+        chain.get_mixing_time(max_steps=0)
+
+        tracemalloc.start()
+        try:
+            chain.get_mixing_time(max_steps=5)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        # A dense array of the distribution from every start would be n * n * 8 bytes
+        self.assertLess(peak, n * n * 8 / 2)
+
+    def test_periodic_chain_does_not_mix(self):
+        chain = MarkovChain(edges=((0, 1), (1, 0)))
+        with self.assertRaises(MarkovChainPropertyError):
+            chain.get_mixing_time()
+
+
+class TestMarkovChainSubchain(unittest.TestCase):
+    def setUp(self):
+        self.chain = MarkovChain(
+            nodes=['a', 'b', 'c', 'd'],
+            edges=((0, 1, 0.5), (0, 2, 0.5), (1, 2), (2, 3, 0.5), (2, 0, 0.5))
+        )
+
+    def test_subchain(self):
+        chain = self.chain.subchain([2, 0, 1])
+
+        self.assertEqual([node.label for node in chain.nodes], ['c', 'a', 'b'])
+        self.assertEqual(len(chain.edges), 4)
+        self.assertEqual(chain.get_edge(0, 1).probability, 0.5)
+        self.assertEqual(chain.get_edge(2, 0).probability, 1)
+        self.assertEqual(len(self.chain.nodes), 4)
+
+    def test_renormalised_subchain(self):
+        chain = self.chain.subchain([0, 1], renormalise=True)
+        self.assertEqual(chain.get_edge(0, 1).probability, 1)
+
+    def test_remove_edge(self):
+        self.chain.remove_edge(2, 3)
+
+        self.assertFalse(self.chain.has_edge(2, 3))
+        self.assertEqual(len(self.chain.edges), 4)
+        self.assertEqual(len(self.chain.nodes[2].edges_out), 1)
+        self.assertTrue(self.chain.nodes[3].is_absorbing())
+        self.assertEqual(self.chain.nodes[3].edges_in, [])
+
+    def test_remove_nodes(self):
+        remap = self.chain.remove_nodes([1])
+
+        self.assertEqual(list(remap), [0, -1, 1, 2])
+        self.assertEqual([node.label for node in self.chain.nodes], ['a', 'c', 'd'])
+        self.assertEqual([node.index for node in self.chain.nodes], [0, 1, 2])
+        self.assertEqual(len(self.chain.edges), 3)
+        self.assertEqual(len(self.chain.nodes[0].edges_out), 1)
+        self.assertTrue(self.chain.has_edge(1, 2))
+        self.assertFalse(self.chain.has_edge(1, 3))
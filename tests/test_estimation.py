@@ -0,0 +1,116 @@
+import unittest
+
+import numpy as np
+
+from src.estimation import OnlineEstimator
+
+
+class TestOnlineEstimator(unittest.TestCase):
+    def test_counts(self):
+        estimator = OnlineEstimator()
+        for state in 'ABAABB':
+            estimator.observe(state)
+
+        self.assertEqual(estimator.states, ['A', 'B'])
+        np.testing.assert_array_equal(estimator.get_count_matrix(), [[1, 2], [1, 1]])
+
+    def test_get_chain(self):
+        estimator = OnlineEstimator(states=['A', 'B', 'C'])
+        estimator.update('A', 'B')
+        estimator.update('A', 'C')
+        estimator.update('A', 'C')
+        estimator.update('B', 'A')
+
+        chain = estimator.get_chain()
+        self.assertEqual([node.label for node in chain.nodes], ['A', 'B', 'C'])
+        np.testing.assert_allclose(chain.get_transition_matrix(), [
+            [0, 1 / 3, 2 / 3],
+            [1, 0, 0],
+            [0, 0, 0],
+        ])
+        self.assertTrue(chain.nodes[2].is_absorbing())
+
+    def test_snapshot_after_update(self):
+        estimator = OnlineEstimator()
+        estimator.update(0, 1)
+        estimator.update(1, 0)
+        first = estimator.get_chain()
+        first_version = first.version
+
+        estimator.update(0, 0)
+        estimator.update(1, 2)
+        second = estimator.get_chain()
+
+        # Earlier chains don't change with later events
+        self.assertIsNot(second, first)
+        self.assertEqual(first.version, first_version)
+        self.assertEqual(len(first.nodes), 2)
+        np.testing.assert_allclose(first.get_transition_matrix(), [[0, 1], [1, 0]])
+        np.testing.assert_allclose(second.get_transition_matrix(), [[0.5, 0.5, 0], [0.5, 0, 0.5], [0, 0, 0]])
+
+    def test_change_returned_chain(self):
+        estimator = OnlineEstimator(states=['A', 'B', 'C'])
+        estimator.update('A', 'B')
+        estimator.update('B', 'C')
+        estimator.get_chain().remove_nodes([0])
+
+        estimator.update('C', 'A')
+        np.testing.assert_allclose(estimator.get_chain().get_transition_matrix(), [
+            [0, 1, 0],
+            [0, 0, 1],
+            [1, 0, 0],
+        ])
+
+    def test_end_sequence(self):
+        estimator = OnlineEstimator()
+        for state in 'AB':
+            estimator.observe(state)
+        estimator.end_sequence()
+        for state in 'AA':
+            estimator.observe(state)
+
+        np.testing.assert_array_equal(estimator.get_count_matrix(), [[1, 1], [0, 0]])
+
+    def test_window(self):
+        estimator = OnlineEstimator(window=2)
+        estimator.update('A', 'A')
+        estimator.update('A', 'B')
+        estimator.update('A', 'B')
+
+        np.testing.assert_array_equal(estimator.get_count_matrix(), [[0, 2], [0, 0]])
+        np.testing.assert_allclose(estimator.get_chain().get_transition_matrix(), [[0, 1], [0, 0]])
+
+    def test_window_empties_row(self):
+        estimator = OnlineEstimator(window=1)
+        estimator.update('A', 'B')
+        estimator.update('B', 'A')
+
+        chain = estimator.get_chain()
+        self.assertTrue(chain.nodes[0].is_absorbing())
+        self.assertEqual(len(chain.edges), 1)
+
+    def test_decay(self):
+        estimator = OnlineEstimator(decay=0.5)
+        estimator.update('A', 'A')
+        estimator.update('A', 'B')
+        estimator.update('A', 'B')
+
+        np.testing.assert_allclose(estimator.get_count_matrix(), [[0.25, 1.5], [0, 0]])
+        np.testing.assert_allclose(estimator.get_chain().get_transition_matrix(), [[1 / 7, 6 / 7], [0, 0]])
+
+    def test_decay_rescales(self):
+        estimator = OnlineEstimator(decay=0.5)
+        for _ in range(1000):
+            estimator.update('A', 'B')
+        estimator.update('A', 'A')
+
+        np.testing.assert_allclose(estimator.get_count_matrix(), [[1, 1], [0, 0]])
+        np.testing.assert_allclose(estimator.get_chain().get_transition_matrix(), [[0.5, 0.5], [0, 0]])
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            OnlineEstimator(decay=0.5, window=10)
+        with self.assertRaises(ValueError):
+            OnlineEstimator(decay=0)
+        with self.assertRaises(ValueError):
+            OnlineEstimator(window=0)
@@ -0,0 +1,113 @@
+import csv
+import gzip
+import io
+import os
+import tempfile
+import unittest
+import xml.etree.ElementTree as ElementTree
+from decimal import Decimal
+from fractions import Fraction
+
+import numpy as np
+
+from src.markov_chain import MarkovChain
+from src.export import write_dot, write_graphml, write_edge_list
+
+GRAPHML_NAMESPACE = '{http://graphml.graphdrawing.org/xmlns}'
+
+
+def get_chain():
+    return MarkovChain(
+        nodes=['A "start"', 'B & <b>', None],
+        edges=[(0, 1, 0.1), (0, 2, 0.9), (1, 1, 1 / 3), (1, 2, 2 / 3)]
+    )
+
+
+class TestExport(unittest.TestCase):
+    def test_write_dot(self):
+        stream = io.StringIO()
+        write_dot(get_chain(), stream, chunk_size=1)
+
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(lines[0], 'digraph "chain" {')
+        self.assertEqual(lines[1], '  0 [label="A \\"start\\""];')
+        self.assertEqual(lines[3], '  2 [label="2"];')
+        self.assertEqual(lines[6], '  1 -> 1 [label="0.3333333333333333"];')
+        self.assertEqual(lines[-1], '}')
+        self.assertEqual(len(lines), 9)
+
+    def test_write_graphml(self):
+        stream = io.StringIO()
+        write_graphml(get_chain(), stream, chunk_size=2)
+
+        graph = ElementTree.fromstring(stream.getvalue()).find(GRAPHML_NAMESPACE + 'graph')
+        nodes = graph.findall(GRAPHML_NAMESPACE + 'node')
+        edges = graph.findall(GRAPHML_NAMESPACE + 'edge')
+
+        self.assertEqual([node[0].text for node in nodes], ['A "start"', 'B & <b>', '2'])
+        self.assertEqual(len(edges), 4)
+        self.assertEqual(edges[3].get('source'), nodes[1].get('id'))
+        self.assertEqual(edges[3].get('target'), nodes[2].get('id'))
+        self.assertEqual(float(edges[3][0].text), 2 / 3)
+
+    def test_write_edge_list(self):
+        stream = io.StringIO()
+        write_edge_list(get_chain(), stream, chunk_size=3)
+
+        rows = list(csv.reader(io.StringIO(stream.getvalue())))
+        self.assertEqual(rows[0], ['from', 'to', 'from_label', 'to_label', 'probability'])
+        self.assertEqual(rows[1], ['0', '1', 'A "start"', 'B & <b>', '0.1'])
+        self.assertEqual(rows[2], ['0', '2', 'A "start"', '', '0.9'])
+        self.assertEqual(float(rows[3][4]), 1 / 3)
+        self.assertEqual(len(rows), 5)
+
+    def test_write_compressed_edge_list(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'edges.csv.gz')
+            write_edge_list(get_chain(), filename)
+
+            with gzip.open(filename, 'rt') as f:
+                rows = list(csv.reader(f))
+
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[4], ['1', '2', 'B & <b>', '', repr(2 / 3)])
+
+    def test_numpy_probabilities(self):
+        chain = MarkovChain(2)
+        chain.add_edge(0, 1, np.float64(0.5))
+        chain.add_edge(1, 0, np.float32(0.25))
+
+        for write in (write_dot, write_graphml, write_edge_list):
+            stream = io.StringIO()
+            write(chain, stream)
+            self.assertNotIn('np.', stream.getvalue())
+
+        rows = list(csv.reader(io.StringIO(stream.getvalue())))
+        self.assertEqual([row[4] for row in rows[1:]], ['0.5', '0.25'])
+
+    def test_exact_probabilities(self):
+        chain = MarkovChain(2)
+        chain.add_edge(0, 1, Fraction(1, 3))
+        chain.add_edge(1, 0, Decimal('0.10000000000000000001'))
+
+        stream = io.StringIO()
+        write_edge_list(chain, stream)
+        rows = list(csv.reader(io.StringIO(stream.getvalue())))
+        self.assertEqual([row[4] for row in rows[1:]], ['1/3', '0.10000000000000000001'])
+
+        stream = io.StringIO()
+        write_dot(chain, stream)
+        self.assertIn('[label="1/3"]', stream.getvalue())
+
+        # GraphML probabilities are doubles
+        stream = io.StringIO()
+        write_graphml(chain, stream)
+        self.assertIn(repr(1 / 3), stream.getvalue())
+
+    def test_write_to_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'chain.dot')
+            write_dot(get_chain(), filename)
+
+            with open(filename) as f:
+                self.assertEqual(len(f.readlines()), 9)
@@ -0,0 +1,140 @@
+import unittest
+from decimal import Decimal
+from fractions import Fraction
+
+import numpy as np
+
+from src.generators import birth_death, corridor, grid_walk
+
+
+def without_structure(chain):
+    """ Return a copy of the chain, which has no recorded structure. """
+    return chain.subchain(range(len(chain.nodes)))
+
+
+class TestGenerators(unittest.TestCase):
+    def test_birth_death(self):
+        chain = birth_death(3, 0.5, 0.25)
+        np.testing.assert_allclose(chain.get_transition_matrix(), [
+            [0.5, 0.5, 0],
+            [0.25, 0.25, 0.5],
+            [0, 0.25, 0.75],
+        ])
+        self.assertEqual(chain.structure, {'family': 'birth_death', 'bandwidth': (1, 1)})
+
+    def test_birth_death_sequences(self):
+        chain = birth_death(3, [1, 0.5, 0], [0, 0.5, 1], labels=['A', 'B', 'C'])
+        self.assertEqual([node.label for node in chain.nodes], ['A', 'B', 'C'])
+        np.testing.assert_allclose(chain.get_transition_matrix(), [
+            [0, 1, 0],
+            [0.5, 0, 0.5],
+            [0, 1, 0],
+        ])
+
+    def test_birth_death_number_types(self):
+        for probability in (Fraction(1, 4), Decimal('0.25'), np.float32(0.25)):
+            chain = birth_death(3, probability, probability)
+            self.assertEqual(chain.get_edge(1, 2).probability, probability)
+
+    def test_exact_birth_death(self):
+        chain = corridor(2, Fraction(1, 3), Fraction(1, 3))
+        steps = chain.get_expected_steps_before_absorption(exact=True)
+        self.assertEqual(list(steps[:, 0]), [Fraction(9), Fraction(6)])
+
+    def test_invalid_birth_death(self):
+        with self.assertRaises(ValueError):
+            birth_death(3, 0.6, 0.6)
+        with self.assertRaises(ValueError):
+            birth_death(3, [0.5, 0.5], 0.1)
+
+    def test_corridor(self):
+        chain = corridor(3, 1)
+        self.assertEqual(len(chain.nodes), 4)
+        self.assertTrue(chain.nodes[3].is_absorbing())
+        np.testing.assert_allclose(chain.get_expected_steps_before_absorption(), [[3], [2], [1]])
+
+    def test_grid_walk(self):
+        chain = grid_walk(2, 3, absorbing=[5])
+        self.assertEqual(chain.nodes[1].label, '(1, 0)')
+        self.assertEqual(len(chain.nodes[0].edges_out), 2)
+        self.assertEqual(len(chain.nodes[4].edges_out), 3)
+        self.assertTrue(chain.nodes[5].is_absorbing())
+        self.assertEqual(chain.structure['bandwidth'], (3, 3))
+        chain.validate()
+
+    def test_structure_forgotten_after_change(self):
+        chain = corridor(3, 0.5)
+        chain.add_edge(0, 2, 0)
+        self.assertIsNone(chain.structure)
+
+
+class TestBandedSolvers(unittest.TestCase):
+    def assert_expected_steps_match(self, chain):
+        expected = without_structure(chain)
+        np.testing.assert_allclose(chain.get_expected_steps(), expected.get_expected_steps())
+        np.testing.assert_allclose(
+            chain.get_expected_steps_before_absorption(),
+            expected.get_expected_steps_before_absorption()
+        )
+
+    def test_corridor_expected_steps(self):
+        self.assert_expected_steps_match(corridor(50, 0.6, 0.3))
+
+    def test_gamblers_ruin_expected_steps(self):
+        chain = birth_death(21, 0.5, 0.5, absorbing=[0, 20])
+        steps = chain.get_expected_steps_before_absorption()
+
+        # Expected duration of the game starting with i is i(20 - i)
+        i = np.arange(1, 20)
+        np.testing.assert_allclose(steps[:, 0], i * (20 - i))
+        self.assert_expected_steps_match(chain)
+
+    def test_grid_walk_expected_steps(self):
+        self.assert_expected_steps_match(grid_walk(6, 5, absorbing=[0, 29], stay=0.2))
+
+    def test_banded_residual(self):
+        steps, residual = corridor(10, 0.5, 0.25).get_expected_steps_before_absorption(return_residual=True)
+        self.assertEqual(steps.shape, (10, 1))
+        self.assertLess(residual, 1e-12)
+
+    def test_float32(self):
+        chain = corridor(10, 0.5, 0.25)
+        steps = chain.get_expected_steps_before_absorption(dtype=np.float32)
+        self.assertEqual(steps.dtype, np.float32)
+        np.testing.assert_allclose(steps, without_structure(chain).get_expected_steps_before_absorption(), rtol=1e-5)
+
+    def test_longdouble_uses_general_solver(self):
+        chain = corridor(10, 0.5, 0.25)
+        steps = chain.get_expected_steps_before_absorption(dtype=np.longdouble)
+        self.assertEqual(steps.dtype, np.longdouble)
+        np.testing.assert_allclose(steps.astype(float), chain.get_expected_steps_before_absorption())
+
+    def test_exact_uses_general_solver(self):
+        chain = corridor(3, 0.5)
+        self.assertEqual(chain.get_expected_steps_before_absorption(exact=True)[0, 0], 6)
+
+    def test_birth_death_stationary_distribution(self):
+        chain = birth_death(30, 0.3, 0.5)
+        expected = without_structure(chain).get_stationary_distribution()
+        np.testing.assert_allclose(chain.get_stationary_distribution(), expected, atol=1e-10)
+
+        # Ratios of consecutive probabilities are birth / death
+        distribution = chain.get_stationary_distribution()
+        np.testing.assert_allclose(distribution[1:] / distribution[:-1], 0.6)
+
+    def test_long_birth_death_stationary_distribution(self):
+        # Probabilities vary by a factor of 4^2000, which would overflow without logs
+        distribution = birth_death(2000, 0.2, 0.8).get_stationary_distribution()
+        self.assertTrue(np.isfinite(distribution).all())
+        self.assertAlmostEqual(distribution[0], 0.75)
+
+    def test_periodic_stationary_distribution(self):
+        chain = birth_death(5, [1, 0.5, 0.5, 0.5, 0], [0, 0.5, 0.5, 0.5, 1])
+        np.testing.assert_allclose(chain.get_stationary_distribution(), [1 / 8, 1 / 4, 1 / 4, 1 / 4, 1 / 8])
+
+    def test_grid_walk_stationary_distribution(self):
+        chain = grid_walk(4, 3)
+
+        # The stationary probability of each state is proportional to its number of neighbours
+        degrees = np.array([len(node.edges_out) for node in chain.nodes])
+        np.testing.assert_allclose(chain.get_stationary_distribution(), degrees / degrees.sum())
@@ -0,0 +1,54 @@
+import os
+import subprocess
+import sys
+import unittest
+
+SRC_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+# Importing numpy and scipy alone takes several times this long
+IMPORT_TIME_BUDGET = 0.2
+
+
+def run_in_subprocess(code):
+    """ Run code in a fresh interpreter, in the src directory, and return its output. """
+    result = subprocess.run(
+        [sys.executable, '-c', code],
+        cwd=SRC_DIRECTORY,
+        check=True,
+        stdout=subprocess.PIPE,
+        universal_newlines=True
+    )
+    return result.stdout.split()
+
+
+class TestImport(unittest.TestCase):
+    def test_import_time(self):
+        output = run_in_subprocess(
+            'import time\n'
+            'start = time.perf_counter()\n'
+            'from markov_chain import MarkovChain\n'
+            'print(time.perf_counter() - start)\n'
+        )
+        self.assertLess(float(output[0]), IMPORT_TIME_BUDGET)
+
+    def test_heavy_modules_not_imported(self):
+        output = run_in_subprocess(
+            'import sys\n'
+            'from markov_chain import MarkovChain\n'
+            'chain = MarkovChain(3)\n'
+            'chain.add_edges(((0, 1, 0.5), (0, 2, 0.5)))\n'
+            'chain.is_absorbing()\n'
+            'print(*(name in sys.modules for name in ("numpy", "scipy", "fractions", "draw_svg")))\n'
+        )
+        self.assertEqual(output, ['False'] * 4)
+
+    def test_modules_imported_when_used(self):
+        output = run_in_subprocess(
+            'import sys\n'
+            'from markov_chain import MarkovChain\n'
+            'chain = MarkovChain(3)\n'
+            'chain.add_edges(((0, 1, 0.5), (0, 2, 0.5)))\n'
+            'print(chain.get_hitting_times([1])[1])\n'
+            'print(*(name in sys.modules for name in ("numpy", "scipy.sparse")))\n'
+        )
+        self.assertEqual(output, ['0.0', 'True', 'True'])
@@ -0,0 +1,103 @@
+import tracemalloc
+import unittest
+
+import numpy as np
+
+# Imported the way the library imports it, so phases from src.markov_chain are collected
+from instrumentation import phase, collecting, add_collector, remove_collector, Collector
+from src.markov_chain import MarkovChain
+
+
+class TestInstrumentation(unittest.TestCase):
+    def test_phase_without_collectors(self):
+        with phase('test', size=10) as current_phase:
+            pass
+        self.assertIs(current_phase, phase('other'))
+
+    def test_collect_phase(self):
+        with collecting() as collector:
+            with phase('test', size=10):
+                data = [0] * 100
+
+        self.assertEqual(len(collector.records), 1)
+        record = collector.records[0]
+        self.assertEqual(record['name'], 'test')
+        self.assertEqual(record['sizes'], {'size': 10})
+        self.assertGreaterEqual(record['time'], 0)
+        self.assertGreaterEqual(record['allocations'], 1)
+
+    def test_memory_not_traced_by_default(self):
+        with collecting() as collector:
+            self.assertFalse(tracemalloc.is_tracing())
+            with phase('test'):
+                pass
+
+        self.assertIsNone(collector.records[0]['peak_memory'])
+        self.assertIsNone(collector.summary()['test']['peak_memory'])
+        self.assertIn('-', collector.report().splitlines()[1])
+
+    def test_trace_memory(self):
+        with collecting(trace_memory=True):
+            self.assertTrue(tracemalloc.is_tracing())
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_stop_collecting(self):
+        collector = Collector()
+        add_collector(collector)
+        with phase('first'):
+            pass
+
+        remove_collector(collector)
+        with phase('second'):
+            pass
+
+        self.assertEqual([record['name'] for record in collector.records], ['first'])
+
+    def test_callback(self):
+        names = []
+        with collecting(lambda record: names.append(record['name'])):
+            with phase('test'):
+                pass
+
+        self.assertEqual(names, ['test'])
+
+    def test_summary(self):
+        with collecting() as collector:
+            for _ in range(3):
+                with phase('repeated'):
+                    pass
+            with phase('once'):
+                pass
+
+        summary = collector.summary()
+        self.assertEqual(summary['repeated']['count'], 3)
+        self.assertEqual(summary['once']['count'], 1)
+
+        report = collector.report().splitlines()
+        self.assertEqual(len(report), 3)
+        self.assertTrue(report[0].startswith('phase'))
+
+    def test_array_memory(self):
+        with collecting(trace_memory=True) as collector:
+            with phase('outer'):
+                with phase('allocate'):
+                    array = np.ones((1000, 1000))
+                with phase('temporary'):
+                    np.ones((1000, 1000)).sum()
+
+        records = {record['name']: record for record in collector.records}
+        self.assertGreaterEqual(records['allocate']['memory'], array.nbytes)
+        self.assertLess(records['temporary']['memory'], array.nbytes)
+        self.assertGreaterEqual(records['temporary']['peak_memory'], array.nbytes)
+        self.assertGreaterEqual(records['outer']['peak_memory'], 2 * array.nbytes)
+
+    def test_expected_steps_phases(self):
+        chain = MarkovChain(edges=[(i, i + 1, 0.5) for i in range(100)] + [(i, i, 0.5) for i in range(100)])
+
+        with collecting(trace_memory=True) as collector:
+            chain.get_expected_steps()
+
+        records = {record['name']: record for record in collector.records}
+        self.assertEqual(records['get_expected_steps.build_matrix']['sizes'], {'nodes': 101, 'edges': 200})
+        self.assertEqual(records['get_expected_steps.invert']['sizes'], {'size': 100})
+        self.assertGreaterEqual(records['get_expected_steps.invert']['memory'], 100 * 100 * 8)
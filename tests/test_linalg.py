@@ -0,0 +1,30 @@
+import unittest
+
+import numpy as np
+
+from src.linalg import solve, inverse, relative_residual
+
+
+class TestLinalg(unittest.TestCase):
+    def setUp(self):
+        self.A = np.array([[0.0, 2.0, 1.0], [1.0, 1.0, 0.0], [3.0, 0.0, 1.0]])
+        self.b = np.array([3.0, 2.0, 4.0])
+
+    def test_solve(self):
+        for dtype in (np.float32, np.float64, np.longdouble):
+            x = solve(self.A.astype(dtype), self.b)
+            self.assertEqual(x.dtype, dtype)
+            np.testing.assert_allclose(x.astype(float), [1, 1, 1], rtol=1e-6)
+
+    def test_inverse(self):
+        A = self.A.astype(np.longdouble)
+        np.testing.assert_allclose((A.dot(inverse(A))).astype(float), np.identity(3), atol=1e-15)
+
+    def test_singular(self):
+        A = np.array([[1, 2], [2, 4]], dtype=np.longdouble)
+        with self.assertRaises(np.linalg.LinAlgError):
+            solve(A, np.ones(2))
+
+    def test_relative_residual(self):
+        self.assertEqual(relative_residual(self.A, np.ones(3), self.b), 0)
+        self.assertGreater(relative_residual(self.A, np.array([1, 1, 1.1]), self.b), 0.01)
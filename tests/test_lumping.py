@@ -0,0 +1,84 @@
+import random
+import unittest
+
+import numpy as np
+
+from src.markov_chain import MarkovChain
+from src.lumping import lump, lift
+
+
+def naive_lumping(chain, partition):
+    """ Refine a partition until it is stable, by comparing every node's probabilities into every block. """
+    block_of = list(partition)
+    while True:
+        signatures = []
+        for node in chain.nodes:
+            probabilities = {}
+            for edge in node.edges_out:
+                block = block_of[edge.to_node.index]
+                probabilities[block] = probabilities.get(block, 0) + edge.probability
+            signatures.append((block_of[node.index], tuple(sorted((b, round(p, 10)) for b, p in probabilities.items()))))
+
+        ids = {}
+        new_block_of = [ids.setdefault(signature, len(ids)) for signature in signatures]
+        if len(ids) == len(set(block_of)):
+            return new_block_of
+        block_of = new_block_of
+
+
+class TestLumping(unittest.TestCase):
+    def setUp(self):
+        # Node 0 moves to one of four identical nodes, which each return or are absorbed
+        edges = [(0, i, 0.25) for i in range(1, 5)]
+        edges += [(i, 0, 0.5) for i in range(1, 5)]
+        edges += [(i, 5, 0.5) for i in range(1, 5)]
+        self.chain = MarkovChain(edges=edges)
+
+    def test_lump(self):
+        quotient, mapping = lump(self.chain)
+
+        self.assertEqual(len(quotient.nodes), 3)
+        self.assertEqual(list(mapping), [0, 1, 1, 1, 1, 2])
+        self.assertEqual(quotient.get_edge(0, 1).probability, 1)
+        self.assertEqual(quotient.get_edge(1, 2).probability, 0.5)
+
+    def test_initial_partition(self):
+        partition = [0, 0, 1, 1, 1, 2]
+        _, mapping = lump(self.chain, partition)
+        self.assertEqual(list(mapping), [0, 1, 2, 2, 2, 3])
+
+    def test_not_lumpable(self):
+        chain = MarkovChain(edges=((0, 1, 0.5), (0, 2, 0.5), (1, 3, 0.5), (1, 0, 0.5), (2, 3)))
+        quotient, mapping = lump(chain)
+        self.assertEqual(len(quotient.nodes), 4)
+
+    def test_lift_expected_steps(self):
+        quotient, mapping = lump(self.chain)
+        steps = quotient.get_expected_steps_before_absorption()
+
+        lifted = lift(steps, mapping, [0, 1, 2, 3, 4], [0, 1])
+        expected = self.chain.get_expected_steps_before_absorption()
+        np.testing.assert_allclose(lifted, expected)
+
+    def test_lift(self):
+        self.assertEqual(list(lift([10, 20, 30], [0, 1, 1, 2])), [10, 20, 20, 30])
+
+    def test_matches_naive_refinement(self):
+        rng = random.Random(0)
+        for _ in range(50):
+            n = rng.randint(2, 30)
+            edges = []
+            for i in range(n - 1):
+                # Few distinct probabilities, so there are nodes to lump
+                targets = rng.sample(range(n), rng.randint(1, min(3, n)))
+                edges += [(i, j, 1 / len(targets)) for j in targets]
+            chain = MarkovChain(n, edges)
+
+            partition = [node.index if node.is_absorbing() else -1 for node in chain.nodes]
+            _, mapping = lump(chain)
+            expected = naive_lumping(chain, partition)
+
+            # The same nodes are grouped together
+            pairs = {(a, b) for a, b in zip(mapping, expected)}
+            self.assertEqual(len(pairs), len(set(mapping)))
+            self.assertEqual(len(pairs), len(set(expected)))
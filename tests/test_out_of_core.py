@@ -0,0 +1,112 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from src.markov_chain import MarkovChain
+from src import out_of_core
+from src.out_of_core import write_edge_file, read_edge_file, power_iteration
+
+
+class TestOutOfCore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'chain.edges')
+        self.chain = MarkovChain(edges=(
+            (0, 0, 0.5), (0, 1, 0.5),
+            (1, 0, 0.25), (1, 1, 0.25), (1, 2, 0.5),
+            (2, 1, 0.5), (2, 2, 0.5),
+        ))
+        write_edge_file(self.chain, self.filename)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_write_edge_file(self):
+        edges = read_edge_file(self.filename)
+        self.assertEqual(len(edges), 7)
+        self.assertEqual(tuple(edges[2]), (1, 0, 0.25))
+
+    def test_write_edges_from_generator(self):
+        write_edge_file(((i, i + 1, 1.0) for i in range(5)), self.filename, block_size=2)
+        edges = read_edge_file(self.filename)
+        self.assertEqual(list(edges['to']), [1, 2, 3, 4, 5])
+
+    def test_n_step_distribution(self):
+        distribution = power_iteration(self.filename, start=0, steps=2, block_size=3)
+        np.testing.assert_allclose(distribution, self.chain.get_n_step_distribution(0, 2))
+
+    def test_blocks_spanning_many_states(self):
+        # Blocks of edges to distant states are summed by sorting rather than over their range
+        n = 100
+        chain = MarkovChain(edges=[(i, i * 37 % n, 0.5) for i in range(n)] + [(i, (i + 1) % n, 0.5) for i in range(n)])
+        write_edge_file(chain, self.filename)
+
+        distribution = power_iteration(self.filename, start=0, steps=4, block_size=2)
+        np.testing.assert_allclose(distribution, chain.get_n_step_distribution(0, 4))
+
+    def test_stationary_distribution(self):
+        distribution = power_iteration(self.filename, block_size=3)
+        np.testing.assert_allclose(distribution, [0.2, 0.4, 0.4])
+
+    def test_absorbing_states(self):
+        write_edge_file(((0, 1, 0.5), (0, 2, 0.5)), self.filename)
+        distribution = power_iteration(self.filename, start=0, steps=3)
+        self.assertEqual(list(distribution), [0, 0.5, 0.5])
+
+    def test_resume_from_checkpoint(self):
+        checkpoint = os.path.join(self.directory, 'checkpoint.npz')
+
+        # Interrupt the run after its third checkpoint
+        save_checkpoint = out_of_core.save_checkpoint
+        saved = []
+
+        def interrupted_save(*args):
+            save_checkpoint(*args)
+            saved.append(args)
+            if len(saved) == 3:
+                raise KeyboardInterrupt
+
+        with mock.patch.object(out_of_core, 'save_checkpoint', interrupted_save):
+            with self.assertRaises(KeyboardInterrupt):
+                power_iteration(self.filename, start=0, steps=5, checkpoint=checkpoint, checkpoint_interval=1)
+
+        distribution, iteration = out_of_core.load_checkpoint(checkpoint)
+        self.assertEqual(iteration, 3)
+
+        # Resuming continues from step 3 rather than the start
+        distribution = power_iteration(self.filename, start=0, steps=5, checkpoint=checkpoint)
+        np.testing.assert_allclose(distribution, self.chain.get_n_step_distribution(0, 5))
+
+    def test_checkpoint_with_different_parameters(self):
+        checkpoint = os.path.join(self.directory, 'checkpoint.npz')
+        power_iteration(self.filename, start=0, steps=5, checkpoint=checkpoint)
+
+        for kwargs in ({'start': 0, 'steps': 2}, {'start': 2, 'steps': 5}, {'start': 0, 'steps': 5, 'lazy': True}):
+            with self.assertRaises(ValueError):
+                power_iteration(self.filename, checkpoint=checkpoint, **kwargs)
+
+        # Rewriting the edge file also invalidates the checkpoint
+        os.utime(self.filename, ns=(0, 0))
+        with self.assertRaises(ValueError):
+            power_iteration(self.filename, start=0, steps=5, checkpoint=checkpoint)
+
+    def test_checkpoint_past_steps(self):
+        checkpoint = os.path.join(self.directory, 'checkpoint.npz')
+        power_iteration(self.filename, start=0, steps=5, checkpoint=checkpoint)
+
+        distribution, _ = out_of_core.load_checkpoint(checkpoint)
+        parameters = out_of_core._get_checkpoint_parameters(self.filename, 3, 0, 5, False)
+        out_of_core.save_checkpoint(checkpoint, distribution, 7, parameters)
+
+        with self.assertRaises(ValueError):
+            power_iteration(self.filename, start=0, steps=5, checkpoint=checkpoint)
+
+    def test_empty_edge_file(self):
+        write_edge_file([], self.filename)
+        with self.assertRaises(ValueError):
+            power_iteration(self.filename)
+        np.testing.assert_allclose(power_iteration(self.filename, n_states=2), [0.5, 0.5])
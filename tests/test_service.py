@@ -0,0 +1,141 @@
+import asyncio
+import threading
+import unittest
+
+from src.markov_chain import MarkovChain
+from src.service import AnalysisService, ServiceBusyError
+
+
+class SlowChain(MarkovChain):
+    """ Chain with a method that blocks until released and counts its calls. """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = 0
+        self.release = threading.Event()
+
+    def slow(self, value=0):
+        self.calls += 1
+        self.release.wait(5)
+        return [value, self.version]
+
+
+class GatedChain(MarkovChain):
+    """ Chain with a method that blocks until its named gate is opened. """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = []
+        self.gates = {name: threading.Event() for name in ('a', 'b', 'c', 'd', 'e')}
+
+    def wait(self, name):
+        self.calls.append(name)
+        self.gates[name].wait(5)
+        return name
+
+
+class TestAnalysisService(unittest.IsolatedAsyncioTestCase):
+    async def test_run_method(self):
+        chain = MarkovChain(nodes=['A', 'B'])
+        chain.add_edge(0, 1, 1)
+
+        async with AnalysisService() as service:
+            steps = await service.run(chain, 'get_expected_steps')
+        self.assertEqual(list(steps), [1])
+
+    async def test_coalesce_identical_requests(self):
+        chain = SlowChain(nodes=['A'])
+
+        async with AnalysisService() as service:
+            tasks = [asyncio.ensure_future(service.run(chain, 'slow', value=1)) for _ in range(5)]
+            await asyncio.sleep(0.05)
+            self.assertEqual(service.in_progress, 1)
+            chain.release.set()
+            results = await asyncio.gather(*tasks)
+
+        self.assertEqual(chain.calls, 1)
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(service.in_progress, 0)
+
+    async def test_different_arguments_not_coalesced(self):
+        chain = SlowChain(nodes=['A'])
+        chain.release.set()
+
+        async with AnalysisService() as service:
+            results = await asyncio.gather(service.run(chain, 'slow', 1), service.run(chain, 'slow', 2))
+
+        self.assertEqual(chain.calls, 2)
+        self.assertEqual([result[0] for result in results], [1, 2])
+
+    async def test_rerun_after_chain_changes(self):
+        chain = SlowChain(nodes=['A'])
+        chain.release.set()
+
+        async with AnalysisService() as service:
+            first = await service.run(chain, 'slow')
+            chain.add_node('B')
+            second = await service.run(chain, 'slow')
+
+        self.assertEqual(chain.calls, 2)
+        self.assertNotEqual(first[1], second[1])
+
+    async def test_busy(self):
+        chain = SlowChain(nodes=['A'])
+
+        async with AnalysisService(max_running=1, max_waiting=1) as service:
+            running = asyncio.ensure_future(service.run(chain, 'slow', 1))
+            await asyncio.sleep(0.05)
+            waiting = asyncio.ensure_future(service.run(chain, 'slow', 2))
+            await asyncio.sleep(0.05)
+
+            with self.assertRaises(ServiceBusyError):
+                await service.run(chain, 'slow', 3)
+
+            # Identical requests share the running calculation rather than waiting
+            duplicate = asyncio.ensure_future(service.run(chain, 'slow', 1))
+
+            chain.release.set()
+            results = await asyncio.gather(running, waiting, duplicate)
+
+        self.assertEqual([result[0] for result in results], [1, 2, 1])
+        self.assertEqual(chain.calls, 2)
+
+    async def test_unhashable_arguments(self):
+        chain = SlowChain(nodes=['A'])
+        chain.release.set()
+
+        async with AnalysisService() as service:
+            result = await service.run(chain, 'slow', value=[1, {2}])
+        self.assertEqual(result[0], [1, {2}])
+
+    async def test_exception(self):
+        chain = MarkovChain(nodes=['A'])
+
+        async with AnalysisService() as service:
+            with self.assertRaises(AttributeError):
+                await service.run(chain, 'not_a_method')
+
+    async def test_coalesced_request_releases_its_place(self):
+        chain = GatedChain(nodes=['A'])
+
+        async with AnalysisService(max_running=2) as service:
+            running = [asyncio.ensure_future(service.run(chain, 'wait', name)) for name in 'ab']
+            await asyncio.sleep(0.05)
+
+            # Two identical requests wait, then start one after the other
+            waiting = [asyncio.ensure_future(service.run(chain, 'wait', 'c')) for _ in range(2)]
+            await asyncio.sleep(0.05)
+            chain.gates['a'].set()
+            chain.gates['b'].set()
+            await asyncio.sleep(0.05)
+
+            # The second shares the first's calculation, so a new request can run
+            other = asyncio.ensure_future(service.run(chain, 'wait', 'd'))
+            await asyncio.sleep(0.05)
+            self.assertEqual(chain.calls, ['a', 'b', 'c', 'd'])
+
+            chain.gates['c'].set()
+            chain.gates['d'].set()
+            results = await asyncio.gather(*running, *waiting, other)
+
+        self.assertEqual(results, ['a', 'b', 'c', 'c', 'd'])
@@ -0,0 +1,85 @@
+import io
+import unittest
+from fractions import Fraction
+
+import numpy as np
+
+from src.utils import approximate_fractions, format_fractions, write_matrix_with_fractions
+
+
+class TestApproximateFractions(unittest.TestCase):
+    def test_simple_fractions(self):
+        numerators, denominators = approximate_fractions([0.5, 1 / 3, -2 / 7, 3, 0])
+        self.assertEqual(list(numerators), [1, 1, -2, 3, 0])
+        self.assertEqual(list(denominators), [2, 3, 7, 1, 1])
+
+    def test_matches_limit_denominator(self):
+        values = np.random.default_rng(1).random(500)
+        numerators, denominators = approximate_fractions(values, 1000)
+
+        for value, numerator, denominator in zip(values, numerators, denominators):
+            expected = Fraction(value).limit_denominator(1000)
+            self.assertEqual(Fraction(int(numerator), int(denominator)), expected)
+
+    def test_matches_limit_denominator_at_all_scales(self):
+        rng = np.random.default_rng(2)
+        values = rng.random(2000) * 10.0 ** rng.integers(-6, 20, 2000) * rng.choice([-1, 1], 2000)
+        values = np.append(values, 263.50114611603044)
+
+        for max_denominator in (1000, 1000000):
+            numerators, denominators = approximate_fractions(values, max_denominator)
+            for value, numerator, denominator in zip(values, numerators, denominators):
+                expected = Fraction(value).limit_denominator(max_denominator)
+                self.assertEqual((int(numerator), int(denominator)), (expected.numerator, expected.denominator))
+
+    def test_large_values(self):
+        numerators, denominators = approximate_fractions([1e20, 0.5])
+        self.assertEqual(list(numerators), [10 ** 20, 1])
+        self.assertEqual(list(denominators), [1, 2])
+
+    def test_not_finite(self):
+        _, denominators = approximate_fractions([np.inf, np.nan])
+        self.assertEqual(list(denominators), [0, 0])
+
+    def test_scalar(self):
+        numerators, denominators = approximate_fractions(0.5)
+        self.assertEqual(numerators.shape, ())
+        self.assertEqual((numerators, denominators), (1, 2))
+
+    def test_near_ties(self):
+        # Values halfway between two candidates, and either side of halfway
+        halves = np.array([(a + 0.5) / d for d in range(2, 100) for a in range(d)])
+        values = np.concatenate([halves, np.nextafter(halves, 0), np.nextafter(halves, 1), [0.4722222222222222]])
+
+        for max_denominator in (10, 50):
+            numerators, denominators = approximate_fractions(values.reshape(1, -1), max_denominator)
+            expected = [Fraction(value).limit_denominator(max_denominator) for value in values.tolist()]
+            self.assertEqual(list(numerators[0]), [fraction.numerator for fraction in expected])
+            self.assertEqual(list(denominators[0]), [fraction.denominator for fraction in expected])
+
+
+class TestFormatFractions(unittest.TestCase):
+    def test_format(self):
+        strings = format_fractions(np.array([[0.5, 1 / 3], [-2, np.inf]]))
+        self.assertEqual(strings.tolist(), [['1/2', '1/3'], ['-2', 'inf']])
+
+    def test_format_exact(self):
+        matrix = np.array([[Fraction(1, 3000001), Fraction(2)]], dtype=object)
+        self.assertEqual(format_fractions(matrix).tolist(), [['1/3000001', '2']])
+
+
+class TestWriteMatrixWithFractions(unittest.TestCase):
+    def test_write(self):
+        stream = io.StringIO()
+        write_matrix_with_fractions(np.array([[0.5, 0.25], [0, 1]]), stream)
+        self.assertEqual(stream.getvalue(), "1/2  1/4\n0    1  \n")
+
+    def test_write_scalar(self):
+        stream = io.StringIO()
+        write_matrix_with_fractions(np.float64(0.5), stream)
+        self.assertEqual(stream.getvalue(), "1/2\n")
+
+    def test_write_nonzero_only(self):
+        stream = io.StringIO()
+        write_matrix_with_fractions(np.array([[0.5, 0], [0, 0.75]]), stream, nonzero_only=True)
+        self.assertEqual(stream.getvalue(), "0  0  1/2\n1  1  3/4\n")